@@ -0,0 +1,146 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import MonsterHunterWeapons
+import MonsterHunterCatalog
+import MonsterHunterInventory
+
+try:
+    import MonsterHunterEngine
+except ImportError:
+    MonsterHunterEngine = None
+
+REPORTS = {
+    "status": ("inventory", "weapon", "craftable", "count", "missing"),
+    "craftable": ("inventory", "weapon", "count"),
+    "missing": ("inventory", "weapon", "missing"),
+    "costs": ("inventory", "weapon", "root", "steps", "cost", "missing"),
+}
+
+def load_table(catalog_path, use_cache=True):
+    return MonsterHunterCatalog.load_catalog(catalog_path, MonsterHunterWeapons.CraftingHashTable(), use_cache=use_cache)
+
+def craft_counts(table, inventory):
+    if MonsterHunterEngine is not None:
+        counts = MonsterHunterEngine.craft_counts(inventory, table)
+        return {weapon: (None if count == MonsterHunterEngine.UNLIMITED else count) for weapon, count in counts.items()}
+    return {weapon: recipe.craft_count(inventory) for weapon, recipe in table.display_all_recipes()}
+
+def report_rows(report, table, weapons, inventory_name, inventory):
+    counts = craft_counts(table, inventory) if report != "costs" else None
+    for weapon in weapons:
+        recipe = table.get_materials(weapon)
+        if report == "costs":
+            path = table.get_upgrade_path(weapon)
+            cost = table.get_upgrade_cost(weapon)
+            missing = {material: qty - inventory.get(material, 0)
+                       for material, qty in cost.items() if inventory.get(material, 0) < qty}
+            yield {"inventory": inventory_name, "weapon": weapon, "root": path[0], "steps": len(path) - 1,
+                   "cost": cost, "missing": missing}
+            continue
+
+        count = counts[weapon]
+        craftable = count is None or count > 0
+        if report == "craftable":
+            if craftable:
+                yield {"inventory": inventory_name, "weapon": weapon, "count": count}
+        elif report == "missing":
+            if not craftable:
+                yield {"inventory": inventory_name, "weapon": weapon, "missing": recipe.missing(inventory)}
+        else:
+            yield {"inventory": inventory_name, "weapon": weapon, "craftable": craftable, "count": count,
+                   "missing": {} if craftable else recipe.missing(inventory)}
+
+def _csv_value(value):
+    if isinstance(value, dict):
+        return '; '.join(f"{qty} {material}" for material, qty in value.items())
+    if value is None:
+        return ""
+    return value
+
+def write_rows(rows, fields, out, fmt):
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([_csv_value(row[field]) for field in fields])
+            count += 1
+    elif fmt == "jsonl":
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    else:
+        out.write("[")
+        for row in rows:
+            out.write(("," if count else "") + "\n  " + json.dumps(row, ensure_ascii=False))
+            count += 1
+        out.write("\n]\n" if count else "]\n")
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report craftable weapons, missing materials and upgrade costs "
+                                                 "for one or more inventory files.")
+    parser.add_argument("inventories", nargs="+", help="inventory files (.csv, .json or .jsonl)")
+    parser.add_argument("--catalog", default=MonsterHunterWeapons.DEFAULT_CATALOG_PATH, help="weapon catalog JSON")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the compiled catalog cache")
+    parser.add_argument("--report", choices=sorted(REPORTS), default="status")
+    parser.add_argument("--format", choices=("json", "jsonl", "csv"), default="jsonl")
+    parser.add_argument("--weapon", action="append", help="limit the report to this weapon (repeatable)")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--strict", action="store_true", help="fail on unknown materials or invalid rows")
+    args = parser.parse_args(argv)
+
+    try:
+        table = load_table(args.catalog, use_cache=not args.no_cache)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        parser.error(f"could not load catalog {args.catalog}: {e}")
+
+    if args.weapon:
+        unknown = [weapon for weapon in args.weapon if table.get_materials(weapon) is None]
+        if unknown:
+            parser.error("unknown weapons: " + ', '.join(unknown))
+        weapons = args.weapon
+    else:
+        weapons = sorted(weapon for weapon, _ in table.display_all_recipes())
+
+    known_materials = table.material_names()
+
+    inventories = []
+    for path in args.inventories:
+        try:
+            import_report = MonsterHunterInventory.read_inventory_file(path, known_materials)
+        except (OSError, ValueError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        if import_report.unknown or import_report.invalid:
+            message = (f"{path}: {len(import_report.unknown)} unknown materials, "
+                       f"{len(import_report.invalid)} invalid rows")
+            if args.strict:
+                print(f"error: {message}", file=sys.stderr)
+                return 1
+            print(f"warning: {message}", file=sys.stderr)
+        inventories.append((path, import_report.totals))
+
+    def rows():
+        for path, inventory in inventories:
+            yield from report_rows(args.report, table, weapons, path, inventory)
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        write_rows(rows(), REPORTS[args.report], out, args.format)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
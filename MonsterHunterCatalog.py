@@ -0,0 +1,208 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+import MonsterHunterWeapons
+
+CACHE_MAGIC = b"MHCAT\x03"
+CACHE_BYTEORDER = b"L" if sys.byteorder == "little" else b"B"
+CACHE_HEADER = struct.Struct("=6sc1xqqIIIII")
+CACHE_SUFFIX = ".mhcache"
+
+def read_catalog_json(path):
+    with open(path, encoding="utf-8") as f:
+        catalog = json.load(f)
+    if not isinstance(catalog, dict):
+        raise ValueError("expected a JSON object with weapons and upgrades")
+
+    weapons = []
+    for index, weapon in enumerate(catalog.get("weapons", [])):
+        if not isinstance(weapon, dict) or not isinstance(weapon.get("name"), str) or "materials" not in weapon:
+            raise ValueError(f"weapon {index} needs a name and materials")
+        weapons.append((weapon["name"], weapon["materials"]))
+
+    upgrades = []
+    for index, edge in enumerate(catalog.get("upgrades", [])):
+        if not isinstance(edge, list) or len(edge) != 2:
+            raise ValueError(f"upgrade {index} must be a [base, upgrade] pair")
+        upgrades.append((edge[0], edge[1]))
+    return weapons, upgrades
+
+def write_catalog_json(table, path):
+    weapons = sorted(table.display_all_recipes(), key=lambda x: x[0])
+    upgrades = [(base_item, upgraded_item)
+                for base_item, _ in weapons
+                for upgraded_item in table.get_upgrades(base_item)]
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{\n  "weapons": [\n')
+        f.write(',\n'.join("    " + json.dumps({"name": weapon, "materials": dict(materials.items())}, ensure_ascii=False)
+                           for weapon, materials in weapons))
+        f.write('\n  ],\n  "upgrades": [\n')
+        f.write(',\n'.join("    " + json.dumps(list(edge), ensure_ascii=False) for edge in upgrades))
+        f.write('\n  ]\n}\n')
+
+def default_cache_path(path):
+    return os.path.splitext(path)[0] + CACHE_SUFFIX
+
+def _padded(data):
+    return data + b"\0" * (-len(data) % 4)
+
+def compile_cache(weapons, upgrades, cache_path, source_stat=None):
+    string_ids = {}
+    strings = []
+
+    def string_id(value):
+        index = string_ids.get(value)
+        if index is None:
+            index = len(strings)
+            string_ids[value] = index
+            strings.append(value)
+        return index
+
+    weapon_ids = array("I")
+    indptr = array("I", [0])
+    material_ids = array("I")
+    quantities = array("I")
+    for weapon, materials in weapons:
+        weapon_ids.append(string_id(weapon))
+        for material, qty in materials.items():
+            material_ids.append(string_id(material))
+            quantities.append(qty)
+        indptr.append(len(material_ids))
+
+    edges = array("I")
+    for base_item, upgraded_item in upgrades:
+        edges.append(string_id(base_item))
+        edges.append(string_id(upgraded_item))
+
+    blob = "\0".join(strings).encode("utf-8")
+
+    mtime_ns, size = (source_stat.st_mtime_ns, source_stat.st_size) if source_stat else (0, 0)
+    header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_BYTEORDER, mtime_ns, size,
+                               len(strings), len(blob), len(weapon_ids), len(material_ids), len(edges) // 2)
+
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(header)
+            for section in (blob, weapon_ids.tobytes(), indptr.tobytes(),
+                            material_ids.tobytes(), quantities.tobytes(), edges.tobytes()):
+                f.write(_padded(section))
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class CatalogCache:
+    def __init__(self, cache_path):
+        with open(cache_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._sections = []
+        view = memoryview(self._mmap)
+        try:
+            (magic, byteorder, self.source_mtime_ns, self.source_size, self.string_count, blob_size,
+             self.weapon_count, entry_count, edge_count) = CACHE_HEADER.unpack_from(view)
+            if magic != CACHE_MAGIC or byteorder != CACHE_BYTEORDER:
+                raise ValueError(f"{cache_path} is not a compatible catalog cache")
+
+            position = CACHE_HEADER.size
+
+            def section(length, fmt="I"):
+                nonlocal position
+                size = length * 4 if fmt == "I" else length
+                if position + size > len(view):
+                    raise ValueError(f"{cache_path} is truncated")
+                data = view[position:position + size]
+                position += size + (-size % 4)
+                self._sections.append(data)
+                if fmt == "I":
+                    data = data.cast(fmt)
+                    self._sections.append(data)
+                return data
+
+            self.string_blob = section(blob_size, "B")
+            self.weapon_ids = section(self.weapon_count)
+            self.indptr = section(self.weapon_count + 1)
+            self.material_ids = section(entry_count)
+            self.quantities = section(entry_count)
+            self.edges = section(edge_count * 2)
+        except (ValueError, struct.error):
+            self._release(view)
+            raise
+        view.release()
+
+    def strings(self):
+        if not self.string_count:
+            return []
+        return [sys.intern(value) for value in str(self.string_blob, "utf-8").split("\0")]
+
+    def is_fresh(self, source_stat):
+        return self.source_mtime_ns == source_stat.st_mtime_ns and self.source_size == source_stat.st_size
+
+    def load_into(self, table):
+        strings = self.strings()
+        intern = MonsterHunterWeapons.material_registry.intern
+        material_map = [None] * len(strings)
+        for string_index in set(self.material_ids):
+            material_map[string_index] = intern(strings[string_index])
+
+        Recipe = MonsterHunterWeapons.Recipe
+        weapons = [strings[index] for index in self.weapon_ids.tolist()]
+        material_ids = [material_map[index] for index in self.material_ids.tolist()]
+        quantities = self.quantities.tolist()
+        indptr = self.indptr.tolist()
+        edges = [strings[index] for index in self.edges.tolist()]
+        with table.batch():
+            table.bulk_load(zip(weapons, [Recipe(material_ids[start:end], quantities[start:end])
+                                          for start, end in zip(indptr, indptr[1:])]))
+            table.load_upgrade_paths(zip(edges[0::2], edges[1::2]))
+        return table
+
+    def _release(self, view=None):
+        for data in reversed(self._sections):
+            data.release()
+        self._sections = []
+        if view is not None:
+            view.release()
+        self._mmap.close()
+
+    def close(self):
+        self._release()
+
+def load_catalog(path, table=None, cache_path=None, use_cache=True):
+    if table is None:
+        table = MonsterHunterWeapons.CraftingHashTable()
+    if cache_path is None:
+        cache_path = default_cache_path(path)
+
+    source_stat = os.stat(path)
+    if use_cache and os.path.exists(cache_path):
+        try:
+            cache = CatalogCache(cache_path)
+        except (OSError, ValueError, struct.error):
+            cache = None
+        if cache is not None:
+            try:
+                if cache.is_fresh(source_stat):
+                    return cache.load_into(table)
+            finally:
+                cache.close()
+
+    weapons, upgrades = read_catalog_json(path)
+    with table.batch():
+        table.bulk_load(weapons)
+        try:
+            table.add_upgrade_paths(upgrades)
+        except KeyError as e:
+            raise ValueError(e.args[0]) from None
+
+    if use_cache:
+        try:
+            compile_cache(weapons, list(dict.fromkeys(upgrades)), cache_path, source_stat)
+        except (OSError, TypeError, ValueError, OverflowError) as e:
+            print(f"warning: could not write catalog cache {cache_path}: {e}", file=sys.stderr)
+    return table
@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import MonsterHunterWeapons
+
+UNLIMITED = np.iinfo(np.int64).max
+
+class RecipeMatrix:
+    def __init__(self, table):
+        recipes = sorted(table.display_all_recipes(), key=lambda x: x[0])
+        self.version = table.version
+        self.weapons = [weapon for weapon, _ in recipes]
+        self.weapon_index = {weapon: row for row, weapon in enumerate(self.weapons)}
+
+        used_ids = sorted({material_id for _, recipe in recipes for material_id in recipe.material_ids})
+        column_of = {material_id: column for column, material_id in enumerate(used_ids)}
+        names = MonsterHunterWeapons.material_registry.names
+        self.materials = [names[material_id] for material_id in used_ids]
+        self.material_index = {material: column for column, material in enumerate(self.materials)}
+
+        lengths = np.fromiter((len(recipe) for _, recipe in recipes), dtype=np.int64, count=len(recipes))
+        self.indptr = np.zeros(len(recipes) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.indices = np.fromiter(
+            (column_of[material_id] for _, recipe in recipes for material_id in recipe.material_ids),
+            dtype=np.int64, count=int(self.indptr[-1]))
+        self.quantities = np.fromiter(
+            (qty for _, recipe in recipes for qty in recipe.quantities),
+            dtype=np.int64, count=int(self.indptr[-1]))
+
+        self.nonempty = np.flatnonzero(lengths)
+        self.starts = self.indptr[:-1][self.nonempty]
+
+    @property
+    def shape(self):
+        return (len(self.weapons), len(self.materials))
+
+    def inventory_vector(self, inventory):
+        vector = np.zeros(len(self.materials), dtype=np.int64)
+        for material, quantity in inventory.items():
+            column = self.material_index.get(material)
+            if column is not None:
+                vector[column] = quantity
+        return vector
+
+    def inventory_matrix(self, inventories):
+        matrix = np.zeros((len(inventories), len(self.materials)), dtype=np.int64)
+        for row, inventory in enumerate(inventories):
+            for material, quantity in inventory.items():
+                column = self.material_index.get(material)
+                if column is not None:
+                    matrix[row, column] = quantity
+        return matrix
+
+    def craft_counts(self, inventory_vector):
+        counts = np.full(len(self.weapons), UNLIMITED, dtype=np.int64)
+        if len(self.starts):
+            ratios = inventory_vector[self.indices] // self.quantities
+            counts[self.nonempty] = np.minimum.reduceat(ratios, self.starts)
+        return counts
+
+    def batch_craft_counts(self, inventory_matrix, chunk_size=256):
+        inventory_matrix = np.asarray(inventory_matrix, dtype=np.int64)
+        counts = np.full((inventory_matrix.shape[0], len(self.weapons)), UNLIMITED, dtype=np.int64)
+        if not len(self.starts):
+            return counts
+        for start in range(0, inventory_matrix.shape[0], chunk_size):
+            block = inventory_matrix[start:start + chunk_size]
+            ratios = block[:, self.indices] // self.quantities
+            counts[start:start + chunk_size, self.nonempty] = np.minimum.reduceat(ratios, self.starts, axis=1)
+        return counts
+
+    def craftable(self, inventory_vector):
+        return self.craft_counts(inventory_vector) > 0
+
+    def shortfall(self, inventory_vector):
+        return np.maximum(self.quantities - inventory_vector[self.indices], 0)
+
+    def missing_materials(self, weapon, inventory_vector):
+        row = self.weapon_index[weapon]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        columns = self.indices[start:end]
+        missing = np.maximum(self.quantities[start:end] - inventory_vector[columns], 0)
+        return {self.materials[column]: int(qty) for column, qty in zip(columns, missing) if qty}
+
+    def can_craft(self, weapon, inventory_vector):
+        row = self.weapon_index[weapon]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return bool(np.all(inventory_vector[self.indices[start:end]] >= self.quantities[start:end]))
+
+COMPILED_CACHE_SIZE = 4
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+def compile_recipes(table=None):
+    if table is None:
+        table = MonsterHunterWeapons.crafting_table
+    version = table.version
+    with _compiled_lock:
+        matrix = _compiled.get(version)
+        if matrix is not None:
+            _compiled.move_to_end(version)
+            return matrix
+
+    matrix = RecipeMatrix(table)
+    with _compiled_lock:
+        _compiled[version] = matrix
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return matrix
+
+def craft_counts(inventory, table=None):
+    matrix = compile_recipes(table)
+    counts = matrix.craft_counts(matrix.inventory_vector(inventory))
+    return dict(zip(matrix.weapons, counts.tolist()))
+
+def batch_craft_counts(inventories, table=None):
+    matrix = compile_recipes(table)
+    return matrix.batch_craft_counts(matrix.inventory_matrix(inventories))
@@ -0,0 +1,253 @@
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import MonsterHunterWeapons
+import MonsterHunterCatalog
+import MonsterHunterInventory
+import MonsterHunterStore
+
+DEFAULT_TRIALS = 100000
+CHUNK_TRIALS = 65536
+MAX_HUNTS = 1000
+BLOCK_ELEMENTS = 1 << 21
+
+class DropTable:
+    def __init__(self, monster, rolls, drops):
+        self.monster = monster
+        self.rolls = rolls
+        self.materials = [material for material, _, _ in drops]
+        weights = np.array([weight for _, weight, _ in drops], dtype=np.float64)
+        if rolls <= 0 or not len(weights) or np.any(weights < 0) or weights.sum() <= 0:
+            raise ValueError(f"Invalid drop table for {monster}")
+        self.probabilities = weights / weights.sum()
+        self.quantities = np.array([quantity for _, _, quantity in drops], dtype=np.int64)
+
+    def expected_yield(self, material):
+        total = 0.0
+        for index, name in enumerate(self.materials):
+            if name == material:
+                total += self.rolls * self.probabilities[index] * self.quantities[index]
+        return total
+
+    def __repr__(self):
+        return f"DropTable({self.monster!r}, rolls={self.rolls}, drops={len(self.materials)})"
+
+def load_drop_tables(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    drop_tables = {}
+    for monster in data.get("monsters", []):
+        drops = [(drop["material"], drop.get("weight", 1), drop.get("quantity", 1)) for drop in monster["drops"]]
+        drop_tables[monster["name"]] = DropTable(monster["name"], monster.get("rolls", 1), drops)
+    return drop_tables
+
+def required_materials(table, target, owned=None, line=True):
+    recipe = table.get_materials(target)
+    if recipe is None:
+        raise KeyError(f"Unknown weapon: {target}")
+    if not line:
+        return dict(recipe.items())
+    return table.get_upgrade_cost(target, owned)
+
+def assign_sources(drop_tables, deficits):
+    sources = {}
+    unobtainable = []
+    for material in deficits:
+        best_monster, best_yield = None, 0.0
+        for monster, drop_table in drop_tables.items():
+            expected = drop_table.expected_yield(material)
+            if expected > best_yield:
+                best_monster, best_yield = monster, expected
+        if best_monster is None:
+            unobtainable.append(material)
+        else:
+            sources[material] = best_monster
+    return sources, unobtainable
+
+def _build_plans(drop_tables, deficits, sources):
+    by_monster = {}
+    for material, monster in sources.items():
+        by_monster.setdefault(monster, []).append(material)
+
+    plans = []
+    for monster in sorted(by_monster):
+        drop_table = drop_tables[monster]
+        materials = sorted(by_monster[monster])
+        column_of = {material: column for column, material in enumerate(materials)}
+        entries = [index for index, material in enumerate(drop_table.materials) if material in column_of]
+        plans.append((monster, materials, drop_table.rolls,
+                      np.cumsum(drop_table.probabilities[entries]),
+                      np.array([column_of[drop_table.materials[index]] for index in entries], dtype=np.int64),
+                      drop_table.quantities[entries],
+                      np.array([deficits[material] for material in materials], dtype=np.int64)))
+    return plans
+
+def _hunts_needed(rolls, cdf, columns, quantities, deficits, trials, rng, max_hunts):
+    hunts = np.full(trials, -1, dtype=np.int32)
+    expected = np.bincount(columns, rolls * np.diff(cdf, prepend=0.0) * quantities, minlength=len(deficits))
+    block = int(min(max_hunts, max(1, np.ceil(1.5 * np.max(deficits / expected)))))
+    rows = max(1, BLOCK_ELEMENTS // (block * rolls))
+
+    yields = np.zeros((len(deficits), len(cdf) + 1), dtype=np.int64)
+    yields[columns, np.arange(len(columns))] = quantities
+    thresholds = cdf.astype(np.float32)
+    targets = deficits[:, None, None]
+
+    for start in range(0, trials, rows):
+        active = np.arange(start, min(start + rows, trials))
+        collected = np.zeros((len(deficits), len(active), 1), dtype=np.int64)
+        hunted = 0
+        while len(active) and hunted < max_hunts:
+            step = min(block, max_hunts - hunted)
+            rolled = rng.random((rolls, len(active), step), dtype=np.float32)
+            categories = np.zeros(rolled.shape, dtype=np.intp)
+            for threshold in thresholds:
+                categories += rolled >= threshold
+            totals = np.empty((len(deficits), len(active), step), dtype=np.int64)
+            for column, column_yields in enumerate(yields):
+                np.cumsum(column_yields[categories].sum(axis=0), axis=1, out=totals[column])
+            totals += collected
+            done = np.all(totals >= targets, axis=0)
+            finished = done.any(axis=1)
+            hunts[active[finished]] = hunted + done[finished].argmax(axis=1) + 1
+            collected = totals[:, ~finished, -1:]
+            active = active[~finished]
+            hunted += step
+    return hunts
+
+def _simulate_chunk(plans, trials, seed, max_hunts):
+    rng = np.random.default_rng(seed)
+    monster_hunts = np.empty((len(plans), trials), dtype=np.int32)
+    for row, (_, _, rolls, cdf, columns, quantities, deficits) in enumerate(plans):
+        monster_hunts[row] = _hunts_needed(rolls, cdf, columns, quantities, deficits, trials, rng, max_hunts)
+    return monster_hunts
+
+class FarmingEstimate:
+    def __init__(self, target, deficits, sources, unobtainable, monsters, monster_hunts, seed, max_hunts):
+        self.target = target
+        self.deficits = deficits
+        self.sources = sources
+        self.unobtainable = unobtainable
+        self.monsters = monsters
+        self.monster_hunts = monster_hunts
+        self.seed = seed
+        self.max_hunts = max_hunts
+        self.completed = np.all(monster_hunts >= 0, axis=0)
+        if unobtainable:
+            self.completed[:] = False
+        self.hunts = np.where(self.completed, monster_hunts.sum(axis=0, dtype=np.int64), -1)
+
+    @property
+    def trials(self):
+        return len(self.hunts)
+
+    @property
+    def censored(self):
+        return int(self.trials - np.count_nonzero(self.completed))
+
+    def mean(self):
+        hunts = self.hunts[self.completed]
+        return float(hunts.mean()) if len(hunts) else None
+
+    def percentile(self, q):
+        if not self.trials:
+            return None
+        value = np.percentile(np.where(self.completed, self.hunts, np.inf), q, method="inverted_cdf")
+        return None if np.isinf(value) else float(value)
+
+    def probability_within(self, hunts):
+        return float(np.mean(self.completed & (self.hunts <= hunts))) if self.trials else None
+
+    def summary(self):
+        return {
+            "target": self.target,
+            "trials": self.trials,
+            "seed": self.seed,
+            "censored": self.censored,
+            "max_hunts": self.max_hunts,
+            "mean": self.mean(),
+            "median": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "deficits": self.deficits,
+            "sources": self.sources,
+            "unobtainable": self.unobtainable,
+            "monsters": {monster: float(hunts[hunts >= 0].mean()) if np.any(hunts >= 0) else None
+                         for monster, hunts in zip(self.monsters, self.monster_hunts)},
+        }
+
+    def __repr__(self):
+        return f"FarmingEstimate({self.target!r}, trials={self.trials}, mean={self.mean()})"
+
+def simulate(drop_tables, target, inventory, table=None, owned=None, line=True, trials=DEFAULT_TRIALS, seed=None,
+             processes=None, chunk_size=CHUNK_TRIALS, max_hunts=MAX_HUNTS):
+    if table is None:
+        table = MonsterHunterWeapons.get_crafting_table()
+
+    needed = required_materials(table, target, owned, line)
+    deficits = {material: qty - inventory.get(material, 0)
+                for material, qty in needed.items() if inventory.get(material, 0) < qty}
+    sources, unobtainable = assign_sources(drop_tables, deficits)
+    plans = _build_plans(drop_tables, deficits, sources)
+
+    seed_sequence = np.random.SeedSequence(seed)
+    sizes = [min(chunk_size, trials - start) for start in range(0, trials, chunk_size)]
+    seeds = seed_sequence.spawn(len(sizes))
+    if processes == 1 or len(sizes) <= 1:
+        chunks = [_simulate_chunk(plans, size, chunk_seed, max_hunts) for size, chunk_seed in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunks = list(pool.map(_simulate_chunk, repeat(plans), sizes, seeds, repeat(max_hunts)))
+
+    monster_hunts = np.concatenate(chunks, axis=1) if chunks else np.empty((len(plans), 0), dtype=np.int32)
+    return FarmingEstimate(target, deficits, sources, unobtainable, [plan[0] for plan in plans],
+                           monster_hunts, seed_sequence.entropy, max_hunts)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate how many hunts it takes to craft a weapon.")
+    parser.add_argument("target", help="weapon to craft")
+    parser.add_argument("--drops", required=True, help="drop table JSON")
+    parser.add_argument("--inventory", help="inventory file (.csv, .json or .jsonl); defaults to the saved inventory")
+    parser.add_argument("--owned", help="weapon already owned on the target's upgrade line")
+    parser.add_argument("--recipe-only", action="store_true", help="only count the target's own recipe")
+    parser.add_argument("--catalog", default=MonsterHunterWeapons.DEFAULT_CATALOG_PATH, help="weapon catalog JSON")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the compiled catalog cache")
+    parser.add_argument("--trials", type=int, default=DEFAULT_TRIALS)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--max-hunts", type=int, default=MAX_HUNTS, help="hunts per monster before a trial is censored")
+    args = parser.parse_args(argv)
+
+    try:
+        table = MonsterHunterCatalog.load_catalog(args.catalog, MonsterHunterWeapons.CraftingHashTable(),
+                                                  use_cache=not args.no_cache)
+        drop_tables = load_drop_tables(args.drops)
+        if args.inventory:
+            inventory = MonsterHunterInventory.read_inventory_file(args.inventory, table.material_names()).totals
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(str(e))
+
+    if not args.inventory:
+        store = MonsterHunterStore.Store()
+        try:
+            inventory = store.load_inventory()
+        finally:
+            store.close()
+
+    try:
+        estimate = simulate(drop_tables, args.target, inventory, table, args.owned, not args.recipe_only,
+                            args.trials, args.seed, args.processes, max_hunts=args.max_hunts)
+    except (KeyError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    json.dump(estimate.summary(), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,40 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import MonsterHunterWeapons
-from collections import defaultdict, deque
+import MonsterHunterInventory
+import MonsterHunterMetrics
+import MonsterHunterPlanner
+import MonsterHunterSearch
+import MonsterHunterStore
+import MonsterHunterVirtualList
+import MonsterHunterWorker
 from PIL import Image, ImageTk
 from datetime import datetime
 import os
 
+SEARCH_DEBOUNCE_MS = 150
+INVENTORY_FILETYPES = [("CSV files", "*.csv"), ("JSON files", "*.json"), ("JSON lines", "*.jsonl *.ndjson"),
+                       ("All files", "*.*")]
+
 class MonsterHunterGUI:
     def __init__(self, master):
         self.master = master
         master.title("Monster Hunter Crafting Table")
         master.geometry("1000x700")
 
-        self.material_inventory = defaultdict(int)
+        self.store = MonsterHunterStore.Store()
+        self.material_inventory = MonsterHunterStore.PersistentInventory(self.store)
+        self._save_after_id = None
+        self.craft_counts = None
+        self.craftable_filter = None
+        self.craftable_weapon_names = []
+        self.material_search_index = None
+        self.material_search_version = None
+        self.weapon_names = []
+        self.weapon_search_index = None
+        self._search_after_id = None
+
+        self.worker = MonsterHunterWorker.ComputeWorker(master)
 
         self.notebook = ttk.Notebook(master)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -32,9 +54,20 @@ class MonsterHunterGUI:
 
         self.setup_craftable_tab(self.craftable_frame)
 
-        self.crafting_queue = MonsterHunterWeapons.CraftingQueue()
+        if MonsterHunterMetrics.ENABLED:
+            self.diagnostics_frame = ttk.Frame(self.notebook)
+            self.notebook.add(self.diagnostics_frame, text="Diagnostics")
+            self.setup_diagnostics_tab(self.diagnostics_frame)
+
+        self.load_queue()
+
+        self.load_history()
 
-        self.crafting_history = MonsterHunterWeapons.CraftingHistory()
+        self.material_inventory.subscribe(self.on_inventory_changed)
+
+        self.update_inventory_view()
+
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_weapons_tab(self, parent):
         search_frame = ttk.Frame(parent)
@@ -56,12 +89,11 @@ class MonsterHunterGUI:
         self.weapon_tree = ttk.Treeview(
             tree_frame,
             columns=('Weapon', 'Materials'),
-            show='headings',
-            yscrollcommand=tree_scroll.set
+            show='headings'
         )
         self.weapon_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        tree_scroll.config(command=self.weapon_tree.yview)
+        self.weapon_list = MonsterHunterVirtualList.VirtualList(self.weapon_tree, tree_scroll, self.weapon_row)
 
         self.weapon_tree.heading('Weapon', text='Weapon Name')
         self.weapon_tree.heading('Materials', text='Crafting Materials')
@@ -81,7 +113,7 @@ class MonsterHunterGUI:
 
         self.populate_weapons()
 
-        self.weapon_tree.bind('<<TreeviewSelect>>', self.show_weapon_details)
+        self.weapon_tree.bind('<<TreeviewSelect>>', self.show_weapon_details, add='+')
 
         add_to_queue_button = ttk.Button(parent, text="Add to Queue", command=self.add_to_queue)
         add_to_queue_button.pack(pady=10)
@@ -92,6 +124,9 @@ class MonsterHunterGUI:
         craft_queue_button = ttk.Button(parent, text="Craft Queue", command=self.craft_queue)
         craft_queue_button.pack(pady=10)
 
+        undo_craft_button = ttk.Button(parent, text="Undo Last Craft", command=self.undo_last_craft)
+        undo_craft_button.pack(pady=10)
+
     def setup_inventory_tab(self, parent):
         title_label = ttk.Label(parent, text="Material Inventory", font=('Helvetica', 16, 'bold'))
         title_label.pack(pady=(10, 20))
@@ -105,6 +140,12 @@ class MonsterHunterGUI:
         remove_button = ttk.Button(button_frame, text="Remove Material", command=self.remove_material)
         remove_button.pack(side=tk.LEFT, padx=5)
 
+        import_button = ttk.Button(button_frame, text="Import...", command=self.import_inventory)
+        import_button.pack(side=tk.LEFT, padx=5)
+
+        export_button = ttk.Button(button_frame, text="Export...", command=self.export_inventory)
+        export_button.pack(side=tk.LEFT, padx=5)
+
         tree_frame = ttk.Frame(parent)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=10)
 
@@ -114,12 +155,11 @@ class MonsterHunterGUI:
         self.inventory_tree = ttk.Treeview(
             tree_frame,
             columns=('Material', 'Quantity'),
-            show='headings',
-            yscrollcommand=tree_scroll.set
+            show='headings'
         )
         self.inventory_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        tree_scroll.config(command=self.inventory_tree.yview)
+        self.inventory_list = MonsterHunterVirtualList.VirtualList(self.inventory_tree, tree_scroll, self.inventory_row)
 
         self.inventory_tree.heading('Material', text='Material Name')
         self.inventory_tree.heading('Quantity', text='Quantity')
@@ -150,12 +190,11 @@ class MonsterHunterGUI:
         self.craftable_tree = ttk.Treeview(
             tree_frame,
             columns=('Weapon', 'Materials', 'Possible'),
-            show='headings',
-            yscrollcommand=tree_scroll.set
+            show='headings'
         )
         self.craftable_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        tree_scroll.config(command=self.craftable_tree.yview)
+        self.craftable_list = MonsterHunterVirtualList.VirtualList(self.craftable_tree, tree_scroll, self.craftable_row)
 
         self.craftable_tree.heading('Weapon', text='Weapon Name')
         self.craftable_tree.heading('Materials', text='Required Materials')
@@ -165,60 +204,127 @@ class MonsterHunterGUI:
         self.craftable_tree.column('Materials', width=400)
         self.craftable_tree.column('Possible', width=100)
 
+    def setup_diagnostics_tab(self, parent):
+        button_frame = ttk.Frame(parent)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        refresh_button = ttk.Button(button_frame, text="Refresh", command=self.show_diagnostics)
+        refresh_button.pack(side=tk.LEFT, padx=(0, 5))
+
+        save_button = ttk.Button(button_frame, text="Save JSON...", command=self.save_diagnostics)
+        save_button.pack(side=tk.LEFT, padx=(0, 5))
+
+        text_frame = ttk.Frame(parent)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+
+        text_scroll = ttk.Scrollbar(text_frame)
+        text_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.diagnostics_text = tk.Text(text_frame, wrap=tk.NONE, yscrollcommand=text_scroll.set)
+        self.diagnostics_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        text_scroll.config(command=self.diagnostics_text.yview)
+        self.diagnostics_text.config(state=tk.DISABLED)
+
+    def show_diagnostics(self):
+        self.diagnostics_text.config(state=tk.NORMAL)
+        self.diagnostics_text.delete(1.0, tk.END)
+        self.diagnostics_text.insert(tk.END, MonsterHunterMetrics.dumps())
+        self.diagnostics_text.config(state=tk.DISABLED)
+
+    def save_diagnostics(self):
+        path = filedialog.asksaveasfilename(title="Save Diagnostics", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+
+        try:
+            MonsterHunterMetrics.dump(path)
+        except OSError as e:
+            messagebox.showerror("Diagnostics", f"Could not save {path}: {e}")
+
+    @MonsterHunterMetrics.timed("gui.filter_craftable_weapons")
     def filter_craftable_weapons(self, event=None):
-        filter_material = self.material_search_entry.get().strip()
-        if filter_material:
-            self.check_craftable_weapons(filter_material)
-        else:
-            self.check_craftable_weapons()
+        self.craftable_filter = self.material_search_entry.get().strip() or None
+        self.apply_craftable_filter()
 
+    def apply_craftable_filter(self, offset=0, refresh=False):
+        if self.craftable_filter:
+            weapons = sorted(self.weapons_using_material(self.craftable_filter))
+        else:
+            weapons = self.craftable_weapon_names
+        self.craftable_list.set_keys(weapons, offset, refresh)
+
+    def weapons_using_material(self, search_term):
+        table = MonsterHunterWeapons.crafting_table
+        if self.material_search_index is None or self.material_search_version != table.version:
+            self.material_search_index = MonsterHunterSearch.NGramIndex()
+            self.material_search_index.add_many((material, material) for material in table.material_names())
+            self.material_search_version = table.version
+
+        weapons = set()
+        for material in self.material_search_index.search(search_term):
+            weapons.update(table.recipes_using(material))
+        return weapons
+
+    @MonsterHunterMetrics.timed("gui.populate_weapons")
     def populate_weapons(self):
-        for i in self.weapon_tree.get_children():
-            self.weapon_tree.delete(i)
+        self.worker.cancel("weapon_search")
+        self.weapon_search_index = None
 
-        recipes = MonsterHunterWeapons.crafting_table.display_all_recipes()
+        self.worker.submit("weapons", MonsterHunterWorker.sorted_weapons,
+                           MonsterHunterWeapons.crafting_table.snapshot(), on_done=self.show_weapons)
 
-        sorted_recipes = sorted(recipes, key=lambda x: x[0])
+    @MonsterHunterMetrics.timed("gui.show_weapons")
+    def show_weapons(self, weapon_names):
+        self.weapon_names = weapon_names
+        self.weapon_list.set_keys(self.weapon_names, offset=0, refresh=True)
 
-        for weapon, materials in sorted_recipes:
-            self.weapon_tree.insert('', 'end', values=(weapon, ', '.join(materials)))
+    def weapon_row(self, weapon):
+        return (weapon, MonsterHunterWeapons.crafting_table.weapon_record(weapon).materials)
 
+    @MonsterHunterMetrics.timed("gui.filter_weapons")
     def filter_weapons(self, event=None):
-        search_term = self.search_entry.get().lower()
-
-        for i in self.weapon_tree.get_children():
-            self.weapon_tree.delete(i)
+        if self._search_after_id is not None:
+            self.master.after_cancel(self._search_after_id)
+        self._search_after_id = self.master.after(SEARCH_DEBOUNCE_MS, self.apply_weapon_filter)
+
+    def apply_weapon_filter(self):
+        self._search_after_id = None
+        search_term = self.search_entry.get()
+        if not search_term:
+            self.worker.cancel("weapon_search")
+            self.weapon_list.set_keys(self.weapon_names, offset=0)
+            return
 
-        recipes = MonsterHunterWeapons.crafting_table.display_all_recipes()
+        self.worker.submit("weapon_search", MonsterHunterWorker.search_weapons,
+                           self.weapon_search_index, self.weapon_names, search_term, on_done=self.show_weapon_matches)
 
-        for weapon, materials in recipes:
-            if search_term in weapon.lower():
-                self.weapon_tree.insert('', 'end', values=(weapon, ', '.join(materials)))
+    @MonsterHunterMetrics.timed("gui.show_weapon_matches")
+    def show_weapon_matches(self, result):
+        self.weapon_search_index, matches = result
+        self.weapon_list.set_keys(matches, offset=0)
 
+    @MonsterHunterMetrics.timed("gui.show_weapon_details")
     def show_weapon_details(self, event):
         self.details_text.config(state=tk.NORMAL)
         self.details_text.delete(1.0, tk.END)
 
-        selected_item = self.weapon_tree.selection()
+        selected_item = self.weapon_list.selection()
         if not selected_item:
             self.details_text.insert(tk.END, "Select a weapon to see details.")
             self.details_text.config(state=tk.DISABLED)
             return
    
-        weapon = self.weapon_tree.item(selected_item[0])['values'][0]
-
-        upgrade_details = []
-        for item, materials in MonsterHunterWeapons.crafting_table.display_all_recipes():
-            if item == weapon:
-                upgrade = MonsterHunterWeapons.crafting_table.get_upgrade(item)
-
-                details = f"Weapon: {item}\n"
-                details += "Materials: " + ', '.join(materials) + "\n"
-                if upgrade:
-                    details += f"Upgrades to: {upgrade}"
-
-                self.details_text.insert(tk.END, details)
-                break
+        record = MonsterHunterWeapons.crafting_table.weapon_record(selected_item[0])
+        if record is not None:
+            details = [f"Weapon: {record.item}", "Materials: " + record.materials]
+            if record.bases:
+                details.append("Upgrades from: " + ', '.join(record.bases))
+            if record.upgrades:
+                details.append("Upgrades to: " + ', '.join(record.upgrades))
+            if record.path_cost is not None:
+                details.append(f"Total cost from {record.path[0]}: {record.path_cost}")
+            self.details_text.insert(tk.END, '\n'.join(details))
 
         self.details_text.config(state=tk.DISABLED)
 
@@ -233,8 +339,6 @@ class MonsterHunterGUI:
 
         self.material_inventory[material] += quantity
 
-        self.update_inventory_view()
-
     def remove_material(self):
         material = simpledialog.askstring("Remove Material", "Enter material name:")
         if not material:
@@ -254,66 +358,117 @@ class MonsterHunterGUI:
             return
 
         self.material_inventory[material] -= quantity
-        if self.material_inventory[material] <= 0:
-            del self.material_inventory[material]
 
-        self.update_inventory_view()
+    def import_inventory(self):
+        path = filedialog.askopenfilename(title="Import Inventory", filetypes=INVENTORY_FILETYPES)
+        if not path:
+            return
+
+        self.worker.submit("inventory_import", MonsterHunterInventory.read_inventory_file, path,
+                           MonsterHunterWeapons.crafting_table.material_names(),
+                           on_done=self.finish_inventory_import,
+                           on_error=lambda e: messagebox.showerror("Import", f"Could not import {path}: {e}"))
+
+    def finish_inventory_import(self, report):
+        MonsterHunterInventory.apply_import(report, self.material_inventory)
+
+        message = f"Imported {len(report)} materials from {report.rows} rows."
+        if report.unknown:
+            message += f"\nSkipped {len(report.unknown)} unknown materials: " + ', '.join(sorted(report.unknown)[:10])
+        if report.invalid:
+            message += f"\nSkipped {len(report.invalid)} invalid rows (first on line {report.invalid[0][0]}: {report.invalid[0][1]})"
+        messagebox.showinfo("Import", message)
+
+    def export_inventory(self):
+        path = filedialog.asksaveasfilename(title="Export Inventory", defaultextension=".csv", filetypes=INVENTORY_FILETYPES)
+        if not path:
+            return
+
+        try:
+            MonsterHunterInventory.export_inventory(self.material_inventory, path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Export", f"Could not export {path}: {e}")
+            return
+        messagebox.showinfo("Export", f"Exported {len(self.material_inventory)} materials to {path}")
+
+    def on_inventory_changed(self, changes):
+        self.update_inventory_view(list(changes))
+
+    @MonsterHunterMetrics.timed("gui.update_inventory_view")
+    def update_inventory_view(self, changed_materials=None):
+        self.schedule_save()
+        if changed_materials is None:
+            sorted_materials = sorted(material for material, quantity in self.material_inventory.items() if quantity > 0)
+            self.inventory_list.set_keys(sorted_materials, refresh=True)
+            self.check_craftable_weapons()
+            return
+
+        in_stock = [material for material in changed_materials if self.material_inventory.get(material, 0) > 0]
+        out_of_stock = [material for material in changed_materials if self.material_inventory.get(material, 0) <= 0]
+        self.inventory_list.update(in_stock, out_of_stock)
 
-    def update_inventory_view(self):
-        for i in self.inventory_tree.get_children():
-            self.inventory_tree.delete(i)
+        if self.worker.pending("craftable"):
+            self.check_craftable_weapons()
+        else:
+            self.refresh_craftable_rows(changed_materials)
 
-        sorted_materials = sorted(self.material_inventory.items())
+    def inventory_row(self, material):
+        return (material, self.material_inventory.get(material, 0))
 
-        for material, quantity in sorted_materials:
-            if quantity > 0:
-                self.inventory_tree.insert('', 'end', values=(material, quantity))
+    @MonsterHunterMetrics.timed("gui.check_craftable_weapons")
+    def check_craftable_weapons(self):
+        self.worker.submit("craftable", MonsterHunterWorker.craftable_weapons,
+                           MonsterHunterWeapons.crafting_table.snapshot(), dict(self.material_inventory),
+                           on_done=self.show_craftable_weapons)
 
-        self.check_craftable_weapons()
+    @MonsterHunterMetrics.timed("gui.show_craftable_weapons")
+    def show_craftable_weapons(self, result):
+        self.craftable_weapon_names, self.craft_counts = result
+        self.apply_craftable_filter(offset=None, refresh=True)
 
-    def check_craftable_weapons(self, filter_material=None):
-        for i in self.craftable_tree.get_children():
-            self.craftable_tree.delete(i)
+    def refresh_craftable_rows(self, changed_materials):
+        affected_weapons = set()
+        for material in changed_materials:
+            affected_weapons.update(MonsterHunterWeapons.crafting_table.recipes_using(material))
 
-        recipes = MonsterHunterWeapons.crafting_table.display_all_recipes()
+        if self.craft_counts is not None:
+            for weapon in affected_weapons:
+                self.craft_counts.pop(weapon, None)
 
-        sorted_recipes = sorted(recipes, key=lambda x: x[0])
+        self.craftable_list.refresh(affected_weapons)
 
-        for weapon, materials in sorted_recipes:
-            required_materials = {}
-            for material_entry in materials:
-                parts = material_entry.split()
-                qty = int(parts[0])
-                material_name = ' '.join(parts[1:])
-                required_materials[material_name] = qty
+    def craftable_row(self, weapon):
+        record = MonsterHunterWeapons.crafting_table.weapon_record(weapon)
+        craft_count = None
+        if self.craft_counts is not None:
+            craft_count = self.craft_counts.get(weapon)
+            if craft_count is None:
+                craft_count = self.craft_counts[weapon] = record.recipe.craft_count(self.material_inventory)
+        return self.craftable_row_values(weapon, record, craft_count)
 
-            if filter_material and not any(filter_material in mat for mat in required_materials):
-                continue
+    def craftable_row_values(self, weapon, record, craft_count=None):
+        materials_str = record.materials
+        if craft_count is not None and craft_count > 0:
+            return (weapon, materials_str, "Yes")
 
-            craftable = True
-            missing_materials = {}
-            for material, req_qty in required_materials.items():
-                if material not in self.material_inventory or self.material_inventory[material] < req_qty:
-                    craftable = False
-                    missing_qty = req_qty - self.material_inventory.get(material, 0)
-                    missing_materials[material] = missing_qty
+        missing_materials = record.recipe.missing(self.material_inventory)
+        craftable = not missing_materials
 
-            materials_str = ', '.join([f"{qty} {mat}" for mat, qty in required_materials.items()])
+        status = "Yes" if craftable else "No"
+        if not craftable:
+            materials_str += " (Missing: " + ', '.join([f"{qty} {mat}" for mat, qty in missing_materials.items()]) + ")"
 
-            status = "Yes" if craftable else "No"
-            if not craftable:
-                materials_str += " (Missing: " + ', '.join([f"{qty} {mat}" for mat, qty in missing_materials.items()]) + ")"
-           
-            self.craftable_tree.insert('', 'end', values=(weapon, materials_str, status))
+        return (weapon, materials_str, status)
 
     def add_to_queue(self):
-        selected_item = self.weapon_tree.selection()
+        selected_item = self.weapon_list.selection()
         if not selected_item:
             messagebox.showwarning("Warning", "Please select a weapon to add to queue")
             return
 
-        weapon = self.weapon_tree.item(selected_item[0])['values'][0]
+        weapon = selected_item[0]
         self.crafting_queue.add_to_queue(weapon)
+        self.schedule_save()
         messagebox.showinfo("Queue", f"{weapon} added to crafting queue")
 
     def remove_from_queue(self):
@@ -325,9 +480,8 @@ class MonsterHunterGUI:
         queue_tree.heading('Weapon', text='Weapon in Queue')
         queue_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        queue_items = list(self.crafting_queue._queue)
-        for weapon in queue_items:
-            queue_tree.insert('', 'end', values=(weapon,))
+        for weapon, count in self.crafting_queue.counts().items():
+            queue_tree.insert('', 'end', iid=weapon, values=(f"{count}× {weapon}",))
 
         def delete_selected():
             selected_item = queue_tree.selection()
@@ -335,19 +489,15 @@ class MonsterHunterGUI:
                 messagebox.showwarning("Warning", "Please select a weapon to remove")
                 return
 
-            weapon = queue_tree.item(selected_item[0])['values'][0]
+            weapon = selected_item[0]
+            self.crafting_queue.remove_from_queue(weapon)
+            self.schedule_save()
 
-            new_queue = deque()
-            removed = False
-            for item in self.crafting_queue._queue:
-                if item == weapon and not removed:
-                    removed = True
-                    continue
-                new_queue.append(item)
-    
-            self.crafting_queue._queue = new_queue
-
-            queue_tree.delete(selected_item)
+            count = self.crafting_queue.count(weapon)
+            if count:
+                queue_tree.item(weapon, values=(f"{count}× {weapon}",))
+            else:
+                queue_tree.delete(weapon)
 
             messagebox.showinfo("Queue", f"{weapon} removed from crafting queue")
 
@@ -358,99 +508,91 @@ class MonsterHunterGUI:
         close_button.pack(pady=10)
 
     def remove_last_from_queue(self):
-        if self.crafting_queue._queue:
-            removed_weapon = self.crafting_queue._queue.pop()
+        if self.crafting_queue:
+            removed_weapon = self.crafting_queue.remove_last()
+            self.schedule_save()
             messagebox.showinfo("Queue", f"{removed_weapon} removed from the end of crafting queue")
         else:
             messagebox.showwarning("Warning", "Crafting queue is empty")
 
     def craft_queue(self):
-        if not self.crafting_queue._queue:
+        if not self.crafting_queue:
             messagebox.showinfo("Queue", "Crafting queue is empty")
             return
-        
-        while self.crafting_queue._queue:
-            self.start_crafting()
-
-        messagebox.showinfo("Queue", "All weapons in queue have been crafted")
 
-    def start_crafting(self):
-        next_weapon = self.crafting_queue.next_to_craft()
-        if next_weapon:
-            materials = MonsterHunterWeapons.crafting_table.get_materials(next_weapon)
+        wishlist = list(self.crafting_queue)
+        inventory_version = self.material_inventory.version
+        self.worker.submit("craft_queue", MonsterHunterPlanner.plan_crafts, dict(self.material_inventory), wishlist,
+                           table=MonsterHunterWeapons.crafting_table.snapshot(),
+                           on_done=lambda plan: self.finish_craft_queue(plan, wishlist, inventory_version))
 
-            if self.check_materials_available(materials):
-                craft_window = tk.Toplevel(self.master)
-                craft_window.title("Crafting Complete")
-                craft_window.geometry("400x300")
-
-                ttk.Label(craft_window, text=f"Successfully crafted: {next_weapon}", font=('Helvetica', 14, 'bold')).pack(pady=10)
-
-                materials_frame = ttk.Frame(craft_window)
-                materials_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+    def finish_craft_queue(self, plan, wishlist, inventory_version):
+        if inventory_version != self.material_inventory.version or list(self.crafting_queue) != wishlist:
+            self.craft_queue()
+            return
 
-                ttk.Label(materials_frame, text="Materials Used:", font=('Helvetica', 12)).pack()
+        entries = self.crafting_queue.planned_entries(plan)
+        with self.material_inventory.batch():
+            report = self.crafting_queue.craft_entries(entries, self.material_inventory)
+        skipped = plan.skipped + report.skipped
 
-                materials_listbox = tk.Listbox(materials_frame)
-                materials_listbox.pack(fill=tk.BOTH, expand=True)
+        for weapon in report.crafted:
+            self.crafting_history.add_craft(weapon, MonsterHunterWeapons.crafting_table.get_materials(weapon))
+        self.schedule_save()
 
-                for material in materials:
-                    materials_listbox.insert(tk.END, material)
+        if skipped:
+            messagebox.showwarning("Queue", f"Crafted {len(report)} weapons. Not enough materials to craft: " + ', '.join(skipped))
+        else:
+            messagebox.showinfo("Queue", "All weapons in queue have been crafted")
 
-                close_button = ttk.Button(craft_window, text="Close", command=craft_window.destroy)
-                close_button.pack(pady=10)
+    def undo_last_craft(self):
+        with self.material_inventory.batch():
+            record = self.crafting_history.undo_last_craft(self.material_inventory)
+        if record is None:
+            messagebox.showinfo("History", "No crafts to undo")
+            return
 
-                self.deduct_materials(materials)
-                self.crafting_history.add_craft(next_weapon)
-            
-            if self.check_materials_available(materials):
-                self.deduct_materials(materials)
-                self.crafting_history.add_craft(next_weapon)
-                messagebox.showinfo("Crafting", f"Crafted {next_weapon}")
-            else:
-                messagebox.showwarning("Warning", f"Not enough materials to craft {next_weapon}")
-                self.crafting_queue._queue.popleft()
+        self.schedule_save()
+        messagebox.showinfo("History", f"Undid crafting {record.item}")
 
     def check_materials_available(self, materials):
-        for material_entry in materials:
-            parts = material_entry.split()
-            qty = int(parts[0])
-            material_name = ' '.join(parts[1:])
-            
-            if material_name not in self.material_inventory or self.material_inventory[material_name] < qty:
+        for material_name, qty in materials.items():
+            if self.material_inventory.get(material_name, 0) < qty:
                 return False
         return True
     
     def deduct_materials(self, materials):
-        for material_entry in materials:
-            parts = material_entry.split()
-            qty = int(parts[0])
-            material_name = ' '.join(parts[1:])
-            
-            self.material_inventory[material_name] -= qty
-
-        self.update_inventory_view()
+        with self.material_inventory.batch():
+            for material_name, qty in materials.items():
+                self.material_inventory[material_name] -= qty
 
     def load_queue(self):
-        for i in self.queue_tree.get_children():
-            self.queue_tree.delete(i)
-
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT item, quantity, status FROM crafting_queue")
-        for row in cursor.fetchall():
-            self.queue_tree.insert("", "end", values=row)
+        self.crafting_queue = MonsterHunterStore.PersistentCraftingQueue(self.store)
 
     def load_history(self):
-        for i in self.history_tree.get_children():
-            self.history_tree.delete(i)
-
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT item, quantity, status, timestamp FROM crafting_history ORDER BY timestamp DESC")
-        for row in cursor.fetchall():
-            self.history_tree.insert("", "end", values=row)
-
-    def __del__(self):
-        self.conn.close()
+        self.crafting_history = MonsterHunterStore.PersistentCraftingHistory(self.store)
+
+    def schedule_save(self):
+        if self._save_after_id is None:
+            self._save_after_id = self.master.after_idle(self.save_state)
+
+    def save_state(self):
+        self._save_after_id = None
+        with self.store.transaction():
+            self.material_inventory.flush()
+            self.crafting_queue.flush()
+            self.crafting_history.flush()
+
+    def close(self):
+        if self._save_after_id is not None:
+            self.master.after_cancel(self._save_after_id)
+        self.save_state()
+        self.worker.shutdown()
+        self.store.close()
+
+    def on_close(self):
+        self.close()
+        self.master.destroy()
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+from contextlib import nullcontext
+import MonsterHunterWeapons
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "json"}
+CANCEL_CHECK_ROWS = 1024
+CSV_HEADER = ("material", "quantity")
+
+class ImportReport:
+    def __init__(self):
+        self.totals = {}
+        self.unknown = {}
+        self.invalid = []
+        self.rows = 0
+        self.applied = False
+        self.cancelled = False
+
+    def __len__(self):
+        return len(self.totals)
+
+    def __repr__(self):
+        return (f"ImportReport(materials={len(self.totals)}, rows={self.rows}, unknown={len(self.unknown)}, "
+                f"invalid={len(self.invalid)}, applied={self.applied})")
+
+def detect_format(path, fmt=None):
+    if fmt is not None:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the inventory format of {path}; use .csv, .json or .jsonl")
+    return FORMATS[extension]
+
+def _csv_rows(f):
+    reader = csv.reader(f)
+    for row in reader:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if tuple(cell.strip().lower() for cell in row) == CSV_HEADER:
+            continue
+        if len(row) != 2:
+            yield reader.line_num, None, None, f"expected 2 columns, got {len(row)}"
+            continue
+        yield reader.line_num, row[0].strip(), row[1].strip(), None
+
+def _jsonl_rows(f):
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, None, f"invalid JSON: {e}"
+            continue
+        yield from _entry_rows(line_number, entry)
+
+def _json_rows(f):
+    try:
+        document = json.load(f)
+    except ValueError as e:
+        yield 1, None, None, f"invalid JSON: {e}"
+        return
+    entries = document if isinstance(document, list) else [document]
+    for entry_number, entry in enumerate(entries, 1):
+        yield from _entry_rows(entry_number, entry)
+
+def _entry_rows(line_number, entry):
+    if not isinstance(entry, dict):
+        yield line_number, None, None, "expected a JSON object"
+    elif "material" in entry:
+        yield line_number, entry["material"], entry.get("quantity"), None
+    else:
+        for material, quantity in entry.items():
+            yield line_number, material, quantity, None
+
+def iter_inventory_file(path, fmt=None):
+    fmt = detect_format(path, fmt)
+    csv_format = fmt == "csv"
+    rows = _csv_rows if csv_format else _json_rows if fmt == "json" else _jsonl_rows
+    with open(path, newline="", encoding="utf-8") as f:
+        for line_number, material, quantity, error in rows(f):
+            if error is None:
+                if csv_format:
+                    try:
+                        quantity = int(quantity)
+                    except (TypeError, ValueError):
+                        error = f"invalid quantity {quantity!r}"
+                elif not isinstance(quantity, int) or isinstance(quantity, bool):
+                    error = f"invalid quantity {quantity!r}"
+            if error is None and (not isinstance(material, str) or not material):
+                error = "missing material name"
+            yield line_number, material, quantity, error
+
+def read_inventory_file(path, known_materials, fmt=None, cancel_event=None):
+    report = ImportReport()
+    totals = report.totals
+    for line_number, material, quantity, error in iter_inventory_file(path, fmt):
+        if cancel_event is not None and report.rows % CANCEL_CHECK_ROWS == 0 and cancel_event.is_set():
+            report.cancelled = True
+            break
+        report.rows += 1
+        if error is None and quantity < 0:
+            error = f"negative quantity {quantity}"
+        if error is not None:
+            report.invalid.append((line_number, error))
+        elif material not in known_materials:
+            report.unknown[material] = report.unknown.get(material, 0) + quantity
+        else:
+            totals[material] = totals.get(material, 0) + quantity
+    return report
+
+def apply_import(report, inventory, replace=False, strict=False):
+    if report.cancelled or strict and (report.unknown or report.invalid):
+        return report
+    batch = inventory.batch() if isinstance(inventory, MonsterHunterWeapons.Inventory) else nullcontext()
+    with batch:
+        if replace:
+            for material in [material for material in inventory if material not in report.totals]:
+                del inventory[material]
+            for material, quantity in report.totals.items():
+                inventory[material] = quantity
+        else:
+            for material, quantity in report.totals.items():
+                if quantity:
+                    inventory[material] = inventory.get(material, 0) + quantity
+    report.applied = True
+    return report
+
+def import_inventory(path, inventory, table=None, fmt=None, replace=False, strict=False):
+    if table is None:
+        table = MonsterHunterWeapons.crafting_table
+    report = read_inventory_file(path, table.material_names(), fmt)
+    return apply_import(report, inventory, replace, strict)
+
+def export_inventory(inventory, path, fmt=None):
+    fmt = detect_format(path, fmt)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            for material in sorted(inventory):
+                if inventory[material] > 0:
+                    writer.writerow((material, inventory[material]))
+        elif fmt == "json":
+            json.dump({material: inventory[material] for material in sorted(inventory) if inventory[material] > 0},
+                      f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        else:
+            for material in sorted(inventory):
+                if inventory[material] > 0:
+                    f.write(json.dumps({"material": material, "quantity": inventory[material]}, ensure_ascii=False) + "\n")
+    os.replace(temp_path, path)
+    return path
@@ -0,0 +1,124 @@
+import atexit
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+ENABLED = os.environ.get("MH_METRICS", "") not in ("", "0")
+OUTPUT_PATH = os.environ.get("MH_METRICS_FILE")
+
+class Histogram:
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+        bucket = int(seconds * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1e3,
+            "mean_us": self.total / self.count * 1e6 if self.count else None,
+            "min_us": self.min * 1e6 if self.min is not None else None,
+            "max_us": self.max * 1e6 if self.max is not None else None,
+            "buckets_us": {f"<{1 << bucket}": count for bucket, count in sorted(self.buckets.items())},
+        }
+
+class Registry:
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self.sources = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Histogram()
+            timer.observe(seconds)
+
+    def register_source(self, name, func):
+        self.sources[name] = func
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def snapshot(self):
+        with self._lock:
+            data = {
+                "enabled": ENABLED,
+                "counters": dict(sorted(self.counters.items())),
+                "timers": {name: timer.to_dict() for name, timer in sorted(self.timers.items())},
+            }
+        for name, func in self.sources.items():
+            data[name] = func()
+        return data
+
+registry = Registry()
+
+def timed(name):
+    def decorate(func):
+        if not ENABLED:
+            return func
+        observe = registry.observe
+        perf_counter = time.perf_counter
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, perf_counter() - start)
+        return wrapper
+    return decorate
+
+def increment(name, amount=1):
+    if ENABLED:
+        registry.increment(name, amount)
+
+def register_source(name, func):
+    registry.register_source(name, func)
+
+def snapshot():
+    return registry.snapshot()
+
+def dumps():
+    return json.dumps(snapshot(), indent=2)
+
+def dump(path):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(dumps())
+        f.write("\n")
+    os.replace(temp_path, path)
+
+def _dump_at_exit():
+    try:
+        dump(OUTPUT_PATH)
+    except OSError:
+        pass
+
+if ENABLED and OUTPUT_PATH:
+    atexit.register(_dump_at_exit)
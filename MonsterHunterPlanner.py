@@ -0,0 +1,212 @@
+import time
+import MonsterHunterWeapons
+
+CHECK_WORK = 1 << 15
+
+class CraftingPlan:
+    def __init__(self, crafts, skipped, score, optimal, materials_used):
+        self.crafts = crafts
+        self.skipped = skipped
+        self.score = score
+        self.optimal = optimal
+        self.materials_used = materials_used
+
+    def __len__(self):
+        return len(self.crafts)
+
+    def __repr__(self):
+        return (f"CraftingPlan(crafts={len(self.crafts)}, skipped={len(self.skipped)}, "
+                f"score={self.score}, optimal={self.optimal})")
+
+class _Candidate:
+    __slots__ = ("weapon", "weight", "needs", "positions", "limit")
+
+    def __init__(self, weapon, weight, needs, positions, limit):
+        self.weapon = weapon
+        self.weight = weight
+        self.needs = needs
+        self.positions = positions
+        self.limit = limit
+
+def _max_take(candidate, remaining):
+    take = candidate.limit
+    for material_id, qty in candidate.needs:
+        take = min(take, remaining[material_id] // qty)
+        if take <= 0:
+            return 0
+    return take
+
+class _BranchAndBound:
+    def __init__(self, candidates, available, deadline, cancel_event=None):
+        self.candidates = candidates
+        self.available = available
+        self.deadline = deadline
+        self.cancel_event = cancel_event
+        self.timed_out = False
+        self.nodes = 0
+
+        users = {}
+        for index, candidate in enumerate(candidates):
+            for material_id, qty in candidate.needs:
+                users.setdefault(material_id, []).append((candidate.weight / qty, index, qty))
+        self.shared_materials = []
+        for material_id, material_users in users.items():
+            if len(material_users) > 1:
+                material_users.sort(reverse=True)
+                self.shared_materials.append((material_id, material_users))
+        self.shared_users = sum(len(material_users) for _, material_users in self.shared_materials)
+
+        self.best_counts = self._greedy()
+        self.best_score = sum(candidate.weight * count for candidate, count in zip(candidates, self.best_counts))
+
+    def _greedy(self):
+        remaining = dict(self.available)
+        counts = []
+        for candidate in self.candidates:
+            take = _max_take(candidate, remaining)
+            for material_id, qty in candidate.needs:
+                remaining[material_id] -= qty * take
+            counts.append(take)
+        return counts
+
+    def _bound(self, depth, remaining):
+        caps = {}
+        base = 0
+        for index in range(depth, len(self.candidates)):
+            candidate = self.candidates[index]
+            cap = _max_take(candidate, remaining)
+            caps[index] = cap
+            base += candidate.weight * cap
+
+        bound = base
+        for material_id, material_users in self.shared_materials:
+            capacity = remaining[material_id]
+            users_value = 0
+            relaxed_value = 0
+            for ratio, index, qty in material_users:
+                cap = caps.get(index)
+                if not cap:
+                    continue
+                weight = self.candidates[index].weight
+                users_value += weight * cap
+                if capacity > 0:
+                    take = min(cap, capacity / qty)
+                    relaxed_value += weight * take
+                    capacity -= take * qty
+            bound = min(bound, base - users_value + relaxed_value)
+        return bound
+
+    def solve(self):
+        candidates = self.candidates
+        n = len(candidates)
+        remaining = dict(self.available)
+        counts = [0] * n
+        next_take = [0] * n
+        score = 0
+        depth = 0
+        entering = True
+        work = 0
+
+        def undo(index):
+            take = counts[index]
+            if take:
+                for material_id, qty in candidates[index].needs:
+                    remaining[material_id] += qty * take
+                counts[index] = 0
+            return candidates[index].weight * take
+
+        while True:
+            self.nodes += 1
+            work += n - depth + self.shared_users
+            if work >= CHECK_WORK:
+                work = 0
+                if time.perf_counter() > self.deadline or self.cancel_event is not None and self.cancel_event.is_set():
+                    self.timed_out = True
+                    break
+
+            if entering:
+                if depth == n or score + self._bound(depth, remaining) <= self.best_score + 1e-9:
+                    if depth == n and score > self.best_score:
+                        self.best_score = score
+                        self.best_counts = list(counts)
+                    depth -= 1
+                    if depth < 0:
+                        break
+                    score -= undo(depth)
+                    entering = False
+                    continue
+                next_take[depth] = _max_take(candidates[depth], remaining)
+
+            take = next_take[depth]
+            if take < 0:
+                depth -= 1
+                if depth < 0:
+                    break
+                score -= undo(depth)
+                entering = False
+                continue
+
+            next_take[depth] = take - 1
+            if take:
+                for material_id, qty in candidates[depth].needs:
+                    remaining[material_id] -= qty * take
+                counts[depth] = take
+                score += candidates[depth].weight * take
+            depth += 1
+            entering = True
+
+        return self.best_counts
+
+def plan_crafts(inventory, wishlist, weights=None, time_budget=1.0, table=None, cancel_event=None):
+    if table is None:
+        table = MonsterHunterWeapons.crafting_table
+    if weights is None:
+        weights = {}
+    deadline = time.perf_counter() + time_budget
+    wishlist = list(wishlist)
+
+    positions = {}
+    skipped = []
+    for position, weapon in enumerate(wishlist):
+        positions.setdefault(weapon, []).append(position)
+
+    available = {}
+    names = MonsterHunterWeapons.material_registry.names
+    candidates = []
+    for weapon, weapon_positions in positions.items():
+        recipe = table.get_materials(weapon)
+        weight = weights.get(weapon, 1)
+        if recipe is None or weight <= 0:
+            skipped.extend(weapon_positions)
+            continue
+        for material_id in recipe.material_ids:
+            if material_id not in available:
+                available[material_id] = inventory.get(names[material_id], 0)
+        candidate = _Candidate(weapon, weight, tuple(zip(recipe.material_ids, recipe.quantities)),
+                               weapon_positions, len(weapon_positions))
+        candidate.limit = _max_take(candidate, available)
+        if candidate.limit:
+            candidates.append(candidate)
+        if candidate.limit < len(weapon_positions):
+            skipped.extend(weapon_positions[candidate.limit:])
+
+    def pressure(candidate):
+        return sum(qty / available[material_id] for material_id, qty in candidate.needs)
+
+    candidates.sort(key=lambda candidate: (-candidate.weight, pressure(candidate)))
+
+    solver = _BranchAndBound(candidates, available, deadline, cancel_event)
+    counts = solver.solve()
+
+    crafted_positions = []
+    materials_used = {}
+    for candidate, count in zip(candidates, counts):
+        crafted_positions.extend(candidate.positions[:count])
+        skipped.extend(candidate.positions[count:candidate.limit])
+        for material_id, qty in candidate.needs:
+            if count:
+                materials_used[names[material_id]] = materials_used.get(names[material_id], 0) + qty * count
+
+    crafts = [wishlist[position] for position in sorted(crafted_positions)]
+    skipped_weapons = [wishlist[position] for position in sorted(skipped)]
+    return CraftingPlan(crafts, skipped_weapons, solver.best_score, not solver.timed_out, materials_used)
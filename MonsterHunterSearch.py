@@ -0,0 +1,70 @@
+class NGramIndex:
+    def __init__(self, n=3):
+        self.n = n
+        self.postings = {}
+        self.texts = {}
+
+    def _grams(self, text):
+        n = self.n
+        return {text[start:start + n] for start in range(len(text) - n + 1)}
+
+    def add(self, key, text):
+        self.add_many(((key, text),))
+
+    def add_many(self, items):
+        postings = self.postings
+        texts = self.texts
+        for key, text in items:
+            if key in texts:
+                self.remove(key)
+            text = text.lower()
+            texts[key] = text
+            for gram in self._grams(text):
+                keys = postings.get(gram)
+                if keys is None:
+                    postings[gram] = {key}
+                else:
+                    keys.add(key)
+
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return False
+        for gram in self._grams(text):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+        return True
+
+    def search(self, query):
+        query = query.lower()
+        texts = self.texts
+        if not query:
+            return set(texts)
+        if len(query) < self.n:
+            return {key for key, text in texts.items() if query in text}
+
+        postings = []
+        for start in range(len(query) - self.n + 1):
+            keys = self.postings.get(query[start:start + self.n])
+            if not keys:
+                return set()
+            postings.append(keys)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            candidates &= keys
+            if not candidates:
+                return candidates
+        if len(query) == self.n:
+            return candidates
+        return {key for key in candidates if query in texts[key]}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __contains__(self, key):
+        return key in self.texts
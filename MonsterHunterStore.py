@@ -0,0 +1,227 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+import MonsterHunterWeapons
+
+DEFAULT_DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "crafting.sqlite3")
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory (
+    material TEXT PRIMARY KEY,
+    quantity INTEGER NOT NULL CHECK (quantity > 0)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS crafting_queue (
+    id INTEGER PRIMARY KEY,
+    item TEXT NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS crafting_history (
+    id INTEGER PRIMARY KEY,
+    item TEXT NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'crafted',
+    timestamp REAL NOT NULL,
+    materials TEXT
+);
+
+CREATE INDEX IF NOT EXISTS crafting_history_timestamp ON crafting_history (timestamp);
+CREATE INDEX IF NOT EXISTS crafting_history_item ON crafting_history (item, timestamp);
+"""
+
+def default_database_path():
+    return os.environ.get("MH_DATABASE", DEFAULT_DATABASE_PATH)
+
+class Store:
+    def __init__(self, path=None):
+        self.path = path or default_database_path()
+        self.conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.lock = threading.RLock()
+        self._depth = 0
+
+        if self.path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"{self.path} uses schema version {version}, newer than {SCHEMA_VERSION}")
+        with self.transaction():
+            self._create_schema()
+            if 0 < version < 2:
+                self._add_column("crafting_history", "materials", "TEXT")
+            if 0 < version < 3:
+                self._add_column("crafting_queue", "priority", "INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def _create_schema(self):
+        for statement in SCHEMA.split(";"):
+            if statement.strip():
+                self.conn.execute(statement)
+
+    def _add_column(self, table, column, definition):
+        columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield self.conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("COMMIT")
+
+    def load_inventory(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT material, quantity FROM inventory"))
+
+    def save_inventory(self, updates):
+        stored = [(material, quantity) for material, quantity in updates.items() if quantity > 0]
+        removed = [(material,) for material, quantity in updates.items() if quantity <= 0]
+        with self.transaction() as conn:
+            if stored:
+                conn.executemany("INSERT INTO inventory (material, quantity) VALUES (?, ?) "
+                                 "ON CONFLICT (material) DO UPDATE SET quantity = excluded.quantity", stored)
+            if removed:
+                conn.executemany("DELETE FROM inventory WHERE material = ?", removed)
+
+    def load_queue(self):
+        with self.lock:
+            return [(item, priority) for item, quantity, priority in
+                    self.conn.execute("SELECT item, quantity, priority FROM crafting_queue "
+                                      "WHERE status = 'queued' ORDER BY id")
+                    for _ in range(quantity)]
+
+    def queue_rows(self):
+        with self.lock:
+            return self.conn.execute("SELECT item, quantity, status FROM crafting_queue ORDER BY id").fetchall()
+
+    def replace_queue(self, entries):
+        rows = []
+        for item, priority in entries:
+            if rows and rows[-1][0] == item and rows[-1][2] == priority:
+                rows[-1][1] += 1
+            else:
+                rows.append([item, 1, priority])
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM crafting_queue")
+            conn.executemany("INSERT INTO crafting_queue (item, quantity, priority) VALUES (?, ?, ?)", rows)
+
+    def append_history(self, records):
+        rows = ((record.item, 1, "crafted", record.timestamp,
+                 json.dumps(dict(record.materials.items()), ensure_ascii=False) if record.materials is not None else None)
+                for record in records)
+        with self.transaction() as conn:
+            conn.executemany("INSERT INTO crafting_history (item, quantity, status, timestamp, materials) "
+                             "VALUES (?, ?, ?, ?, ?)", rows)
+
+    def mark_undone(self, records):
+        with self.transaction() as conn:
+            conn.executemany("UPDATE crafting_history SET status = 'undone' WHERE item = ? AND timestamp = ?",
+                             ((record.item, record.timestamp) for record in records))
+
+    def load_history(self, limit):
+        with self.lock:
+            rows = self.conn.execute("SELECT item, materials, timestamp FROM crafting_history WHERE status = 'crafted' "
+                                     "ORDER BY timestamp DESC LIMIT ?", (limit,)).fetchall()
+        return [MonsterHunterWeapons.CraftingRecord(item, json.loads(materials) if materials else None, timestamp)
+                for item, materials, timestamp in reversed(rows)]
+
+    def history(self, item=None, limit=None, since=None, status=None):
+        query = "SELECT item, quantity, status, timestamp FROM crafting_history"
+        conditions = []
+        params = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if item is not None:
+            conditions.append("item = ?")
+            params.append(item)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class PersistentInventory(MonsterHunterWeapons.Inventory):
+    def __init__(self, store):
+        super().__init__(store.load_inventory())
+        self.store = store
+        self.dirty = set()
+        self.subscribe(self.dirty.update)
+
+    def flush(self):
+        if self.dirty:
+            self.store.save_inventory({material: self.get(material, 0) for material in self.dirty})
+            self.dirty.clear()
+
+class PersistentCraftingQueue(MonsterHunterWeapons.CraftingQueue):
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+        for item, priority in store.load_queue():
+            self.add_to_queue(item, priority)
+        self.saved_version = self.version
+
+    def flush(self):
+        if self.saved_version != self.version:
+            self.store.replace_queue((entry.item, entry.priority) for entry in self.entries())
+            self.saved_version = self.version
+
+class PersistentCraftingHistory(MonsterHunterWeapons.CraftingHistory):
+    def __init__(self, store, max_size=10):
+        super().__init__(max_size)
+        self.store = store
+        self._stack.extend(store.load_history(max_size))
+        self.pending = []
+        self.pending_undo = []
+
+    def add_craft(self, item, materials=None, timestamp=None):
+        record = super().add_craft(item, materials, timestamp)
+        self.pending.append(record)
+        return record
+
+    def undo_last_craft(self, inventory=None):
+        record = super().undo_last_craft(inventory)
+        if record is not None:
+            if self.pending and self.pending[-1] is record:
+                self.pending.pop()
+            else:
+                self.pending_undo.append(record)
+        return record
+
+    def flush(self):
+        if self.pending or self.pending_undo:
+            with self.store.transaction():
+                self.store.append_history(self.pending)
+                self.store.mark_undone(self.pending_undo)
+            self.pending = []
+            self.pending_undo = []
@@ -0,0 +1,220 @@
+from bisect import bisect_left
+from heapq import merge
+
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_OVERSCAN = 20
+BULK_UPDATE_THRESHOLD = 16
+
+class VirtualList:
+    def __init__(self, tree, scrollbar, row_values, overscan=DEFAULT_OVERSCAN):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values
+        self.overscan = overscan
+        self.keys = []
+        self.offset = 0
+        try:
+            self.page_size = max(1, int(tree.cget('height')))
+        except (TypeError, ValueError):
+            self.page_size = DEFAULT_PAGE_SIZE
+
+        self._start = 0
+        self._row_ids = []
+        self._row_keys = []
+        self._selected = set()
+
+        tree.configure(yscrollcommand=self._on_tree_scroll)
+        tree.bind('<Configure>', self._on_configure, add='+')
+        scrollbar.configure(command=self.yview)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        index = bisect_left(self.keys, key)
+        return index < len(self.keys) and self.keys[index] == key
+
+    def index(self, key):
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return index
+        raise ValueError(f"{key!r} is not in the list")
+
+    def set_keys(self, keys, offset=None, refresh=False):
+        self.keys = list(keys)
+        self._render(self.offset if offset is None else offset, refresh)
+
+    def upsert(self, key):
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            self.refresh([key])
+            return index
+        self.keys.insert(index, key)
+        self._shifted(index, 1)
+        return index
+
+    def remove(self, key):
+        index = bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            return False
+        del self.keys[index]
+        self._selected.discard(key)
+        self._shifted(index, -1)
+        return True
+
+    def update(self, upserted=(), removed=()):
+        upserted = list(upserted)
+        removed = [key for key in removed if key in self]
+        if len(upserted) + len(removed) <= BULK_UPDATE_THRESHOLD:
+            for key in removed:
+                self.remove(key)
+            for key in upserted:
+                self.upsert(key)
+            return
+
+        anchor = self.keys[self.offset] if self.offset < len(self.keys) else None
+        keys = self.keys
+        if removed:
+            removed = set(removed)
+            self._selected -= removed
+            keys = [key for key in keys if key not in removed]
+        added = sorted(key for key in set(upserted) if key not in self)
+        if added:
+            keys = list(merge(keys, added))
+        self.keys = keys
+
+        offset = bisect_left(keys, anchor) if anchor is not None else self.offset
+        self._render(offset)
+        self.refresh(upserted)
+
+    def refresh(self, keys=None):
+        if keys is not None:
+            keys = set(keys)
+        for row_id, key in zip(self._row_ids, self._row_keys):
+            if keys is None or key in keys:
+                self.tree.item(row_id, values=self.row_values(key))
+
+    def selection(self):
+        self._sync_selection()
+        return sorted((key for key in self._selected if key in self), key=self.index)
+
+    def see(self, key):
+        index = self.index(key)
+        if index < self.offset:
+            self.scroll_to(index)
+        elif index >= self.offset + self.page_size:
+            self.scroll_to(index - self.page_size + 1)
+
+    def yview(self, *args):
+        if not args:
+            return self._fractions()
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * len(self.keys) + 0.5))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.page_size
+            self.scroll_to(self.offset + amount)
+
+    def scroll_to(self, offset):
+        offset = self._clamp(offset)
+        start = self._start
+        end = start + len(self._row_keys)
+        margin = self.overscan // 2
+        if (start <= offset and offset + self.page_size <= end
+                and (offset - start >= margin or start == 0)
+                and (end - offset - self.page_size >= margin or end == len(self.keys))):
+            self.offset = offset
+            self._move_view()
+        else:
+            self._render(offset)
+
+    def _clamp(self, offset):
+        return max(0, min(offset, len(self.keys) - self.page_size))
+
+    def _shifted(self, index, delta):
+        offset = self.offset + delta if index < self.offset else self.offset
+        if index < self._start + len(self._row_keys) + 1:
+            self._render(offset)
+        else:
+            self.offset = self._clamp(offset)
+            self._update_scrollbar()
+
+    def _sync_selection(self):
+        materialized = dict(zip(self._row_ids, self._row_keys))
+        current = {materialized[row_id] for row_id in self.tree.selection() if row_id in materialized}
+        expected = self._selected.intersection(self._row_keys)
+        if current != expected:
+            self._selected = current
+        return self._selected
+
+    def _render(self, offset, refresh=False):
+        tree = self.tree
+        selected = self._sync_selection()
+        focus_key = dict(zip(self._row_ids, self._row_keys)).get(tree.focus())
+
+        offset = self._clamp(offset)
+        start = max(0, offset - self.overscan)
+        end = min(len(self.keys), offset + self.page_size + self.overscan)
+        window = self.keys[start:end]
+
+        row_ids = self._row_ids
+        row_keys = self._row_keys
+        for slot, key in enumerate(window):
+            if slot < len(row_ids):
+                if refresh or row_keys[slot] != key:
+                    tree.item(row_ids[slot], values=self.row_values(key))
+            else:
+                row_ids.append(tree.insert('', 'end', values=self.row_values(key)))
+        if len(row_ids) > len(window):
+            tree.delete(*row_ids[len(window):])
+            del row_ids[len(window):]
+
+        self._row_keys = window
+        self._start = start
+        self.offset = offset
+
+        selection = [row_id for row_id, key in zip(row_ids, window) if key in selected]
+        if set(selection) != set(tree.selection()):
+            tree.selection_set(selection)
+        if focus_key is not None:
+            index = bisect_left(self.keys, focus_key)
+            if start <= index < end and self.keys[index] == focus_key:
+                tree.focus(row_ids[index - start])
+        self._move_view()
+
+    def _move_view(self):
+        if self._row_keys:
+            self.tree.yview_moveto((self.offset - self._start) / len(self._row_keys))
+        self._update_scrollbar()
+
+    def _fractions(self):
+        count = len(self.keys)
+        if not count:
+            return (0.0, 1.0)
+        return (self.offset / count, min(1.0, (self.offset + self.page_size) / count))
+
+    def _update_scrollbar(self):
+        self.scrollbar.set(*self._fractions())
+
+    def _on_tree_scroll(self, first, last):
+        if not self._row_keys:
+            self._update_scrollbar()
+            return
+        top = self._start + int(float(first) * len(self._row_keys) + 0.5)
+        if top != self.offset:
+            self.scroll_to(top)
+        else:
+            self._update_scrollbar()
+
+    def _on_configure(self, event):
+        slot = self.offset - self._start
+        if not 0 <= slot < len(self._row_ids):
+            return
+        bbox = self.tree.bbox(self._row_ids[slot])
+        if not bbox or bbox[3] <= 0:
+            return
+        page_size = max(1, (event.height - bbox[1]) // bbox[3])
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self._render(self.offset)
@@ -1,296 +1,1382 @@
-from collections import deque
+import gc
+import heapq
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+import MonsterHunterMetrics
+
+class MaterialRegistry:
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        material_id = self.ids.get(name)
+        if material_id is None:
+            name = sys.intern(name)
+            material_id = len(self.names)
+            self.ids[name] = material_id
+            self.names.append(name)
+        return material_id
+
+    def get_id(self, name):
+        return self.ids.get(name)
+
+    def name(self, material_id):
+        return self.names[material_id]
+
+    def __len__(self):
+        return len(self.names)
+
+material_registry = MaterialRegistry()
+
+RECORD_CACHE_SIZE = 1024
+
+_REMOVED = object()
+_table_versions = itertools.count(1)
+
+def _writes(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class Recipe:
+    __slots__ = ("material_ids", "quantities")
+
+    def __init__(self, material_ids, quantities):
+        self.material_ids = tuple(material_ids)
+        self.quantities = tuple(quantities)
+
+    @classmethod
+    def from_dict(cls, materials_dict):
+        intern = material_registry.intern
+        for material, qty in materials_dict.items():
+            cls._check_quantity(material, qty)
+        return cls([intern(material) for material in materials_dict], materials_dict.values())
+
+    @classmethod
+    def from_strings(cls, materials_list):
+        material_ids = []
+        quantities = []
+        for material_entry in materials_list:
+            qty, material = material_entry.split(None, 1)
+            qty = int(qty)
+            cls._check_quantity(material, qty)
+            material_ids.append(material_registry.intern(material))
+            quantities.append(qty)
+        return cls(material_ids, quantities)
+
+    @staticmethod
+    def _check_quantity(material, qty):
+        if not isinstance(qty, int) or isinstance(qty, bool):
+            raise ValueError(f"Quantity of {material} must be an integer, got {qty!r}")
+        if qty < 1:
+            raise ValueError(f"Quantity of {material} must be at least 1, got {qty}")
+
+    @classmethod
+    def coerce(cls, materials):
+        if isinstance(materials, cls):
+            return materials
+        if isinstance(materials, dict):
+            return cls.from_dict(materials)
+        return cls.from_strings(materials)
+
+    def items(self):
+        names = material_registry.names
+        return [(names[material_id], qty) for material_id, qty in zip(self.material_ids, self.quantities)]
+
+    def as_strings(self):
+        names = material_registry.names
+        return [f"{qty} {names[material_id]}" for material_id, qty in zip(self.material_ids, self.quantities)]
+
+    def display(self):
+        return ', '.join(self.as_strings())
+
+    def missing(self, inventory):
+        names = material_registry.names
+        missing = {}
+        for material_id, qty in zip(self.material_ids, self.quantities):
+            available = inventory.get(names[material_id], 0)
+            if available < qty:
+                missing[names[material_id]] = qty - available
+        return missing
+
+    def craft_count(self, inventory):
+        if not self.material_ids:
+            return None
+        names = material_registry.names
+        return min(inventory.get(names[material_id], 0) // qty
+                   for material_id, qty in zip(self.material_ids, self.quantities))
+
+    def __len__(self):
+        return len(self.material_ids)
+
+    def __eq__(self, other):
+        if not isinstance(other, Recipe):
+            return NotImplemented
+        return self.material_ids == other.material_ids and self.quantities == other.quantities
+
+    def __hash__(self):
+        return hash((self.material_ids, self.quantities))
+
+    def __repr__(self):
+        return f"Recipe({self.display()!r})"
+
+class UpgradeGraph:
+    def __init__(self):
+        self.children = {}
+        self.parents = {}
+        self._ancestors = {}
+        self._descendants = {}
+        self._paths = {}
+
+    def add_edge(self, base_item, upgraded_item):
+        if upgraded_item in self.children.get(base_item, ()):
+            return False
+        if self._reaches(upgraded_item, base_item):
+            raise ValueError(f"Upgrade {base_item} -> {upgraded_item} would create a cycle")
+
+        self._invalidate(base_item, upgraded_item)
+        self.children.setdefault(base_item, []).append(upgraded_item)
+        self.parents.setdefault(upgraded_item, []).append(base_item)
+        return True
+
+    def add_edges(self, edges):
+        added = []
+        for base_item, upgraded_item in edges:
+            if upgraded_item in self.children.get(base_item, ()):
+                continue
+            if base_item == upgraded_item:
+                self._rollback(added)
+                raise ValueError(f"Upgrade {base_item} -> {upgraded_item} would create a cycle")
+            self.children.setdefault(base_item, []).append(upgraded_item)
+            self.parents.setdefault(upgraded_item, []).append(base_item)
+            added.append((base_item, upgraded_item))
+
+        if added:
+            cycle_item = self._find_cycle()
+            if cycle_item is not None:
+                self._rollback(added)
+                raise ValueError(f"Upgrade paths through {cycle_item} would create a cycle")
+            self._ancestors.clear()
+            self._descendants.clear()
+            self._paths.clear()
+        return added
+
+    def load_edges(self, edges):
+        children = self.children
+        parents = self.parents
+        for base_item, upgraded_item in edges:
+            children.setdefault(base_item, []).append(upgraded_item)
+            parents.setdefault(upgraded_item, []).append(base_item)
+        self._ancestors.clear()
+        self._descendants.clear()
+        self._paths.clear()
+
+    def _rollback(self, added):
+        for base_item, upgraded_item in reversed(added):
+            self._unlink(self.children, base_item, upgraded_item)
+            self._unlink(self.parents, upgraded_item, base_item)
+
+    def _find_cycle(self):
+        in_degree = {item: len(parents) for item, parents in self.parents.items()}
+        stack = [item for item in self.children if item not in in_degree]
+        visited = 0
+        while stack:
+            item = stack.pop()
+            visited += 1
+            for upgraded_item in self.children.get(item, ()):
+                in_degree[upgraded_item] -= 1
+                if not in_degree[upgraded_item]:
+                    stack.append(upgraded_item)
+        nodes = set(self.children) | set(self.parents)
+        if visited == len(nodes):
+            return None
+        return next(item for item, degree in in_degree.items() if degree)
+
+    def remove_edge(self, base_item, upgraded_item):
+        if upgraded_item not in self.children.get(base_item, ()):
+            return False
+
+        self._invalidate(base_item, upgraded_item)
+        self._unlink(self.children, base_item, upgraded_item)
+        self._unlink(self.parents, upgraded_item, base_item)
+        return True
+
+    def remove_node(self, item):
+        for upgraded_item in list(self.children.get(item, ())):
+            self.remove_edge(item, upgraded_item)
+        for base_item in list(self.parents.get(item, ())):
+            self.remove_edge(base_item, item)
+
+    def _unlink(self, adjacency, key, value):
+        values = adjacency[key]
+        values.remove(value)
+        if not values:
+            del adjacency[key]
+
+    def _reaches(self, start, target):
+        if start == target:
+            return True
+        closure = self._descendants.get(start)
+        if closure is not None:
+            return target in closure
+
+        seen = {start}
+        stack = [start]
+        while stack:
+            for node in self.children.get(stack.pop(), ()):
+                if node == target:
+                    return True
+                if node not in seen:
+                    seen.add(node)
+                    stack.append(node)
+        return False
+
+    def _invalidate(self, base_item, upgraded_item):
+        if self._descendants:
+            self._descendants.pop(base_item, None)
+            for item in self.ancestors(base_item, memoize=False):
+                self._descendants.pop(item, None)
+        if self._ancestors or self._paths:
+            self._ancestors.pop(upgraded_item, None)
+            self._paths.pop(upgraded_item, None)
+            for item in self.descendants(upgraded_item, memoize=False):
+                self._ancestors.pop(item, None)
+                self._paths.pop(item, None)
+
+    def upgrades(self, item):
+        return tuple(self.children.get(item, ()))
+
+    def bases(self, item):
+        return tuple(self.parents.get(item, ()))
+
+    def ancestors(self, item, memoize=True):
+        return self._closure(item, self.parents, self._ancestors, memoize)
+
+    def descendants(self, item, memoize=True):
+        return self._closure(item, self.children, self._descendants, memoize)
+
+    def _closure(self, item, adjacency, cache, memoize=True):
+        closure = cache.get(item)
+        if closure is not None:
+            return closure
+
+        seen = set()
+        stack = list(adjacency.get(item, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            cached = cache.get(node)
+            if cached is not None:
+                seen.add(node)
+                seen.update(cached)
+                continue
+            seen.add(node)
+            stack.extend(adjacency.get(node, ()))
+
+        if not memoize:
+            return seen
+        closure = frozenset(seen)
+        cache[item] = closure
+        return closure
+
+    def path_to(self, item):
+        path = self._paths.get(item)
+        if path is not None:
+            return path
+
+        chain = [item]
+        prefix = ()
+        node = item
+        while node in self.parents:
+            node = self.parents[node][0]
+            cached = self._paths.get(node)
+            if cached is not None:
+                prefix = cached
+                break
+            chain.append(node)
+
+        chain.reverse()
+        for node in chain:
+            prefix = prefix + (node,)
+            self._paths[node] = prefix
+        return prefix
+
+    def path_between(self, base_item, item):
+        if base_item == item:
+            return (item,)
+        if base_item not in self.ancestors(item):
+            return None
+
+        path = [item]
+        node = item
+        while node != base_item:
+            for parent in self.parents[node]:
+                if parent == base_item or base_item in self.ancestors(parent):
+                    node = parent
+                    break
+            path.append(node)
+        path.reverse()
+        return tuple(path)
+
+    def is_root(self, item):
+        return item not in self.parents
+
+    def walk(self, roots):
+        stack = [(root, 0) for root in reversed(list(roots))]
+        while stack:
+            item, depth = stack.pop()
+            yield item, depth
+            for upgraded_item in reversed(self.children.get(item, ())):
+                stack.append((upgraded_item, depth + 1))
+
+class WeaponRecord:
+    __slots__ = ("item", "recipe", "materials", "upgrades", "bases", "path", "path_cost")
+
+    def __init__(self, item, recipe, materials, upgrades, bases, path, path_cost):
+        self.item = item
+        self.recipe = recipe
+        self.materials = materials
+        self.upgrades = upgrades
+        self.bases = bases
+        self.path = path
+        self.path_cost = path_cost
+
+    def __repr__(self):
+        return f"WeaponRecord({self.item!r}, {self.materials!r})"
+
+class PersistentMap:
+    __slots__ = ("_shards", "_mask", "_len")
+
+    def __init__(self, shards=({},), length=0):
+        self._shards = shards
+        self._mask = len(shards) - 1
+        self._len = length
+
+    @classmethod
+    def from_items(cls, items):
+        if not isinstance(items, dict):
+            items = dict(items)
+        shard_count = 1 << math.isqrt(len(items)).bit_length()
+        shards = [{} for _ in range(shard_count)]
+        mask = shard_count - 1
+        for key, value, key_hash in zip(items, items.values(), map(hash, items)):
+            shards[key_hash & mask][key] = value
+        return cls(tuple(shards), len(items))
+
+    def update(self, changes, removals=True):
+        if not changes:
+            return self
+        shard_count = len(self._shards)
+        if len(changes) > self._len // 4 or self._len + len(changes) > 4 * shard_count * shard_count:
+            if self._len:
+                items = dict(self.items())
+                items.update(changes)
+            else:
+                items = changes
+            if removals:
+                items = {key: value for key, value in items.items() if value is not _REMOVED}
+            return PersistentMap.from_items(items)
+
+        old_shards = self._shards
+        shards = list(old_shards)
+        mask = self._mask
+        length = self._len
+        for key, value in changes.items():
+            index = hash(key) & mask
+            shard = shards[index]
+            if shard is old_shards[index]:
+                shard = shards[index] = dict(shard)
+            if value is _REMOVED:
+                if shard.pop(key, _REMOVED) is not _REMOVED:
+                    length -= 1
+            else:
+                if key not in shard:
+                    length += 1
+                shard[key] = value
+        return PersistentMap(tuple(shards), length)
+
+    def get(self, key, default=None):
+        return self._shards[hash(key) & self._mask].get(key, default)
+
+    def items(self):
+        for shard in self._shards:
+            yield from shard.items()
+
+    def __iter__(self):
+        for shard in self._shards:
+            yield from shard
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, key):
+        return key in self._shards[hash(key) & self._mask]
+
+    def __reduce__(self):
+        return (PersistentMap.from_items, (list(self.items()),))
+
+class RecipeSnapshot:
+    def __init__(self, recipes, children, parents, version):
+        self.recipes = recipes
+        self.children = children
+        self.parents = parents
+        self.version = version
+        self._material_index = None
+
+    def get_materials(self, item):
+        return self.recipes.get(item)
+
+    def display_all_recipes(self):
+        return list(self.recipes.items())
+
+    def get_upgrades(self, item):
+        return self.children.get(item, ())
+
+    def get_base_weapons(self, item):
+        return self.parents.get(item, ())
+
+    def get_upgrade_path(self, item):
+        if item not in self.recipes:
+            return None
+        path = [item]
+        parents = self.parents.get(item)
+        while parents:
+            path.append(parents[0])
+            parents = self.parents.get(parents[0])
+        path.reverse()
+        return path
+
+    def get_upgrade_cost(self, target):
+        path = self.get_upgrade_path(target)
+        if path is None:
+            return None
+        cost = {}
+        for item in path:
+            for material, qty in self.recipes.get(item).items():
+                cost[material] = cost.get(material, 0) + qty
+        return cost
+
+    def recipes_using(self, material):
+        material_index = self._material_index
+        if material_index is None:
+            material_index = {}
+            for item, recipe in self.recipes.items():
+                for material_id in recipe.material_ids:
+                    material_index.setdefault(material_id, set()).add(item)
+            self._material_index = material_index
+        material_id = material_registry.get_id(material)
+        return material_index.get(material_id, ()) if material_id is not None else ()
+
+    def material_names(self):
+        names = material_registry.names
+        return {names[material_id] for _, recipe in self.recipes.items() for material_id in recipe.material_ids}
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def __contains__(self, item):
+        return item in self.recipes
 
 class CraftingHashTable:
-    def __init__(self, size=64):
+    def __init__(self, size=64, expected_items=None):
         self.size = size
-        self.table = [[] for _ in range(size)]
+        self.table = [None] * size
         self.num_items = 0
         self.load_factor_threshold = 0.7
-        self.upgrade_paths = {}
-   
-    def _hash(self, key):
-        hash_value = 0
-        for char in str(key):
-            hash_value = (hash_value * 31 + ord(char)) % self.size
-        return hash_value
+        self.upgrade_graph = UpgradeGraph()
+        self._path_costs = {}
+        self._records = OrderedDict()
+        self.record_cache_size = RECORD_CACHE_SIZE
+        self._material_index = defaultdict(set)
+        self.version = next(_table_versions)
+        self._pending_recipes = {}
+        self._pending_removals = False
+        self._pending_graph = set()
+        self._dirty = False
+        self._lock = threading.RLock()
+        self._snapshot = RecipeSnapshot(PersistentMap(), PersistentMap(), PersistentMap(), self.version)
+        if expected_items:
+            self.presize(expected_items)
    
-    def _resize(self):
+    @MonsterHunterMetrics.timed("crafting_table.resize")
+    def _resize(self, new_size=None):
         old_table = self.table
-        self.size *= 2
-        self.table = [[] for _ in range(self.size)]
-        self.num_items = 0
+        self.size = new_size or self.size * 2
+        self.table = [None] * self.size
        
+        size = self.size
+        table = self.table
         for bucket in old_table:
-            for key, value in bucket:
-                self.insert(key, value)
+            if bucket is None:
+                continue
+            for entry in bucket:
+                index = entry[2] % size
+                if table[index] is None:
+                    table[index] = [entry]
+                else:
+                    table[index].append(entry)
    
-    def insert(self, item, materials):
+    def _size_for(self, item_count):
+        size = self.size
+        while item_count / size >= self.load_factor_threshold:
+            size *= 2
+        return size
+
+    def presize(self, item_count):
+        size = self._size_for(self.num_items + item_count)
+        if size != self.size:
+            self._resize(size)
+
+    def _store(self, item, recipe):
         if self.num_items / self.size >= self.load_factor_threshold:
             self._resize()
-           
-        hash_value = self._hash(item)
+
+        full_hash = hash(item)
+        index = full_hash % self.size
+        bucket = self.table[index]
+        if bucket is None:
+            bucket = self.table[index] = []
        
-        for i, (existing_item, _) in enumerate(self.table[hash_value]):
-            if existing_item == item:
-                self.table[hash_value][i] = (item, materials)
+        for i, (existing_item, existing_recipe, existing_hash) in enumerate(bucket):
+            if existing_hash == full_hash and existing_item == item:
+                self._unindex_recipe(item, existing_recipe)
+                bucket[i] = (item, recipe, full_hash)
+                self._index_recipe(item, recipe)
+                self._invalidate_costs(item)
+                self._pending_recipes[item] = recipe
                 return
        
-        self.table[hash_value].append((item, materials))
+        bucket.append((item, recipe, full_hash))
+        self._index_recipe(item, recipe)
         self.num_items += 1
+        self._pending_recipes[item] = recipe
+
+    @MonsterHunterMetrics.timed("crafting_table.insert")
+    @_writes
+    def insert(self, item, materials):
+        self._store(item, Recipe.coerce(materials))
+        self._publish()
+
+    @_writes
+    def insert_many(self, items):
+        items = [(item, Recipe.coerce(materials)) for item, materials in items]
+        self.presize(len(items))
+        for item, recipe in items:
+            self._store(item, recipe)
+        self._publish()
+
+    @_writes
+    def bulk_load(self, items):
+        if self.num_items:
+            self.insert_many(items)
+            return
+
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            recipes = dict(items)
+            coerce = Recipe.coerce
+            for item, materials in recipes.items():
+                if type(materials) is not Recipe:
+                    recipes[item] = coerce(materials)
+
+            self.presize(len(recipes))
+            size = self.size
+            table = self.table
+            for item, recipe, full_hash in zip(recipes, recipes.values(), map(hash, recipes)):
+                index = full_hash % size
+                if table[index] is None:
+                    table[index] = [(item, recipe, full_hash)]
+                else:
+                    table[index].append((item, recipe, full_hash))
+            self._material_index = None
+            self.num_items = len(recipes)
+            if self._pending_recipes:
+                self._pending_recipes.update(recipes)
+            else:
+                self._pending_recipes = recipes
+            self._publish()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
    
+    @MonsterHunterMetrics.timed("crafting_table.get_materials")
     def get_materials(self, item):
-        hash_value = self._hash(item)
+        full_hash = hash(item)
+        bucket = self.table[full_hash % self.size]
+        if bucket is None:
+            return None
        
-        for existing_item, materials in self.table[hash_value]:
-            if existing_item == item:
+        for existing_item, materials, existing_hash in bucket:
+            if existing_hash == full_hash and existing_item == item:
                 return materials
         return None
    
+    @MonsterHunterMetrics.timed("crafting_table.remove")
+    @_writes
     def remove(self, item):
-        hash_value = self._hash(item)
+        full_hash = hash(item)
+        bucket = self.table[full_hash % self.size]
+        if bucket is None:
+            return False
        
-        for i, (existing_item, _) in enumerate(self.table[hash_value]):
-            if existing_item == item:
-                self.table[hash_value].pop(i)
+        for i, (existing_item, existing_recipe, existing_hash) in enumerate(bucket):
+            if existing_hash == full_hash and existing_item == item:
+                bucket.pop(i)
+                self._unindex_recipe(item, existing_recipe)
+                self._invalidate_costs(item)
+                for base_item in self.upgrade_graph.bases(item):
+                    self._records.pop(base_item, None)
+                self._pending_graph.add(item)
+                self._pending_graph.update(self.upgrade_graph.bases(item))
+                self._pending_graph.update(self.upgrade_graph.upgrades(item))
+                self.upgrade_graph.remove_node(item)
                 self.num_items -= 1
+                self._pending_recipes[item] = _REMOVED
+                self._pending_removals = True
+                self._publish()
                 return True
         return False
 
+    def _index_recipe(self, item, recipe):
+        material_index = self._material_index
+        if material_index is not None:
+            for material_id in recipe.material_ids:
+                material_index[material_id].add(item)
+
+    def _unindex_recipe(self, item, recipe):
+        material_index = self._material_index
+        if material_index is None:
+            return
+        for material_id in recipe.material_ids:
+            users = material_index.get(material_id)
+            if users is not None:
+                users.discard(item)
+                if not users:
+                    del material_index[material_id]
+
+    @property
+    def material_index(self):
+        material_index = self._material_index
+        if material_index is None:
+            material_index = defaultdict(set)
+            for bucket in self.table:
+                if bucket:
+                    for item, recipe, _ in bucket:
+                        for material_id in recipe.material_ids:
+                            material_index[material_id].add(item)
+            self._material_index = material_index
+        return material_index
+
+    def bucket_stats(self):
+        chain_lengths = {}
+        for bucket in self.table:
+            length = len(bucket) if bucket else 0
+            chain_lengths[length] = chain_lengths.get(length, 0) + 1
+        occupied = self.size - chain_lengths.get(0, 0)
+        return {
+            "size": self.size,
+            "items": self.num_items,
+            "load_factor": self.num_items / self.size,
+            "occupied_buckets": occupied,
+            "mean_chain_length": self.num_items / occupied if occupied else 0.0,
+            "max_chain_length": max(chain_lengths),
+            "chain_lengths": {str(length): count for length, count in sorted(chain_lengths.items())},
+            "cached_records": len(self._records),
+        }
+
+    def recipes_using(self, material):
+        material_id = material_registry.get_id(material)
+        if material_id is None:
+            return ()
+        return self.material_index.get(material_id, ())
+
+    def material_names(self):
+        names = material_registry.names
+        return {names[material_id] for material_id in self.material_index}
+
+    @_writes
     def add_upgrade_path(self, base_item, upgraded_item):
-        self.upgrade_paths[base_item] = upgraded_item
+        for weapon in (base_item, upgraded_item):
+            if self.get_materials(weapon) is None:
+                raise KeyError(f"Unknown weapon in upgrade path: {weapon}")
+        if self.upgrade_graph.add_edge(base_item, upgraded_item):
+            self._invalidate_costs(upgraded_item)
+            self._records.pop(base_item, None)
+            self._pending_graph.update((base_item, upgraded_item))
+            self._publish()
+
+    @_writes
+    def add_upgrade_paths(self, edges):
+        edges = list(edges)
+        for edge in edges:
+            for weapon in edge:
+                if self.get_materials(weapon) is None:
+                    raise KeyError(f"Unknown weapon in upgrade path: {weapon}")
+        added = self.upgrade_graph.add_edges(edges)
+        if added:
+            self._path_costs.clear()
+            self._records.clear()
+            for edge in added:
+                self._pending_graph.update(edge)
+            self._publish()
+
+    @_writes
+    def load_upgrade_paths(self, edges):
+        graph = self.upgrade_graph
+        if graph.children:
+            self.add_upgrade_paths(edges)
+            return
+
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            graph.load_edges(edges)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        if graph.children:
+            self._path_costs.clear()
+            self._records.clear()
+            self._pending_graph.update(graph.children)
+            self._pending_graph.update(graph.parents)
+            self._publish()
+
+    @_writes
+    def remove_upgrade_path(self, base_item, upgraded_item):
+        if self.upgrade_graph.remove_edge(base_item, upgraded_item):
+            self._invalidate_costs(upgraded_item)
+            self._records.pop(base_item, None)
+            self._pending_graph.update((base_item, upgraded_item))
+            self._publish()
+            return True
+        return False
 
     def get_upgrade(self, item):
-        return self.upgrade_paths.get(item)
+        upgrades = self.upgrade_graph.children.get(item)
+        return upgrades[0] if upgrades else None
+
+    def get_upgrades(self, item):
+        return self.upgrade_graph.upgrades(item)
+
+    def get_base_weapons(self, item):
+        return self.upgrade_graph.bases(item)
+
+    def get_ancestors(self, item):
+        return self.upgrade_graph.ancestors(item)
+
+    def get_descendants(self, item):
+        return self.upgrade_graph.descendants(item)
+
+    def get_upgrade_path(self, item):
+        if self.get_materials(item) is None:
+            return None
+        return list(self.upgrade_graph.path_to(item))
    
+    def _invalidate_costs(self, item):
+        if not self._path_costs and not self._records:
+            return
+        self._path_costs.pop(item, None)
+        self._records.pop(item, None)
+        for descendant in self.upgrade_graph.descendants(item, memoize=False):
+            self._path_costs.pop(descendant, None)
+            self._records.pop(descendant, None)
+
+    def _path_cost(self, item):
+        cost = self._path_costs.get(item)
+        if cost is not None:
+            return cost
+
+        chain = []
+        cost = {}
+        node = item
+        while True:
+            cached = self._path_costs.get(node)
+            if cached is not None:
+                cost = cached
+                break
+            chain.append(node)
+            parents = self.upgrade_graph.parents.get(node)
+            if not parents:
+                break
+            node = parents[0]
+
+        for node in reversed(chain):
+            cost = dict(cost)
+            recipe = self.get_materials(node)
+            for material_id, qty in zip(recipe.material_ids, recipe.quantities):
+                cost[material_id] = cost.get(material_id, 0) + qty
+            self._path_costs[node] = cost
+        return cost
+
+    def get_upgrade_cost(self, target, owned=None):
+        if self.get_materials(target) is None:
+            return None
+
+        if owned is None:
+            cost = self._path_cost(target)
+        elif owned == target:
+            cost = {}
+        elif owned in self.upgrade_graph.path_to(target):
+            owned_cost = self._path_cost(owned)
+            cost = {}
+            for material_id, qty in self._path_cost(target).items():
+                remaining = qty - owned_cost.get(material_id, 0)
+                if remaining:
+                    cost[material_id] = remaining
+        else:
+            path = self.upgrade_graph.path_between(owned, target)
+            if path is None:
+                raise ValueError(f"{target} is not an upgrade of {owned}")
+            cost = {}
+            for node in path[1:]:
+                recipe = self.get_materials(node)
+                for material_id, qty in zip(recipe.material_ids, recipe.quantities):
+                    cost[material_id] = cost.get(material_id, 0) + qty
+
+        names = material_registry.names
+        return {names[material_id]: qty for material_id, qty in cost.items()}
+
+    def weapon_record(self, item):
+        records = self._records
+        record = records.get(item)
+        if record is not None:
+            records.move_to_end(item)
+            return record
+
+        recipe = self.get_materials(item)
+        if recipe is None:
+            return None
+
+        graph = self.upgrade_graph
+        path = graph.path_to(item)
+        path_cost = None
+        if len(path) > 1:
+            names = material_registry.names
+            path_cost = ', '.join(f"{qty} {names[material_id]}" for material_id, qty in self._path_cost(item).items())
+
+        record = WeaponRecord(item, recipe, recipe.display(), graph.upgrades(item), graph.bases(item), path, path_cost)
+        records[item] = record
+        MonsterHunterMetrics.increment("crafting_table.record_builds")
+        if len(records) > self.record_cache_size:
+            records.popitem(last=False)
+        return record
+
     def display_all_recipes(self):
         recipes = []
         for bucket in self.table:
-            for item, materials in bucket:
+            if bucket is None:
+                continue
+            for item, materials, _ in bucket:
                 recipes.append((item, materials))
         return recipes
 
+    @contextmanager
+    def batch(self):
+        with self._lock:
+            yield self
+
+    def _publish(self):
+        self.version = next(_table_versions)
+        self._dirty = True
+
+    def _build_snapshot(self):
+        snapshot = self._snapshot
+        recipes = snapshot.recipes.update(self._pending_recipes, self._pending_removals)
+        children = snapshot.children
+        parents = snapshot.parents
+        changed = self._pending_graph
+        if changed:
+            children = self._graph_map(children, self.upgrade_graph.children, changed)
+            parents = self._graph_map(parents, self.upgrade_graph.parents, changed)
+            self._pending_graph = set()
+        self._pending_recipes = {}
+        self._pending_removals = False
+        self._dirty = False
+        self._snapshot = RecipeSnapshot(recipes, children, parents, self.version)
+
+    def _graph_map(self, current, adjacency, changed):
+        if len(changed) > len(current) // 4:
+            return PersistentMap.from_items((item, tuple(values)) for item, values in adjacency.items())
+        return current.update({item: tuple(adjacency.get(item, ())) or _REMOVED for item in changed})
+
+    def snapshot(self):
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._build_snapshot()
+        return self._snapshot
+
     def display_upgrade_path(self):
-        for item, materials in self.display_all_recipes():
-            upgrade = self.get_upgrade(item)
-            if upgrade:
-                print(f"{item}: {materials} -> Upgrades to: {upgrade}")
-            else:
-                print(f"{item}: {materials}")
+        recipes = dict(self.display_all_recipes())
+        roots = sorted(item for item in recipes if self.upgrade_graph.is_root(item))
+        for item, depth in self.upgrade_graph.walk(roots):
+            print(f"{'    ' * depth}{item}: {recipes[item].display()}")
 
+@_writes
 def insert_with_quantities(self, item, materials_dict):
-    if self.num_items / self.size >= self.load_factor_threshold:
-        self._resize()
+    self._store(item, Recipe.from_dict(materials_dict))
+    self._publish()
 
-    hash_value = self._hash(item)
-    materials_list = [f"{qty} {material}" for material, qty in materials_dict.items()]
+CraftingHashTable.insert_with_quantities = insert_with_quantities
 
-    for i, (existing_item, _) in enumerate(self.table[hash_value]):
-        if existing_item == item:
-            self.table[hash_value][i] = (item, materials_list)
-            return
+class Inventory(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.version = 0
+        self._listeners = []
+        self._changes = {}
+        self._batch_depth = 0
+        self.update(*args, **kwargs)
 
-    self.table[hash_value].append((item, materials_list))
-    self.num_items += 1
+    def __missing__(self, key):
+        return 0
 
-CraftingHashTable.insert_with_quantities = insert_with_quantities
-crafting_table = CraftingHashTable()
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    @contextmanager
+    def batch(self):
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._notify()
+
+    def _changed(self, material, old_quantity):
+        self.version += 1
+        if material not in self._changes:
+            self._changes[material] = old_quantity
+        if self._batch_depth == 0:
+            self._notify()
+
+    def _notify(self):
+        changes = {material: (old_quantity, self.get(material, 0))
+                   for material, old_quantity in self._changes.items()
+                   if old_quantity != self.get(material, 0)}
+        self._changes = {}
+        if changes:
+            for listener in list(self._listeners):
+                listener(changes)
+
+    def __setitem__(self, material, quantity):
+        old_quantity = self.get(material, 0)
+        if quantity <= 0:
+            if material in self:
+                super().__delitem__(material)
+        else:
+            super().__setitem__(material, quantity)
+        self._changed(material, old_quantity)
+
+    def __delitem__(self, material):
+        old_quantity = super().__getitem__(material)
+        super().__delitem__(material)
+        self._changed(material, old_quantity)
+
+    def pop(self, material, *default):
+        if material not in self:
+            return super().pop(material, *default)
+        quantity = super().pop(material)
+        self._changed(material, quantity)
+        return quantity
+
+    def popitem(self):
+        material, quantity = super().popitem()
+        self._changed(material, quantity)
+        return material, quantity
+
+    def setdefault(self, material, default=0):
+        if material not in self:
+            self[material] = default
+        return self.get(material, 0)
+
+    def update(self, *args, **kwargs):
+        with self.batch():
+            for material, quantity in dict(*args, **kwargs).items():
+                self[material] = quantity
+
+    def add(self, materials):
+        with self.batch():
+            for material, quantity in materials.items():
+                self[material] = self.get(material, 0) + quantity
+
+    def clear(self):
+        with self.batch():
+            for material in list(self):
+                del self[material]
+
+class CraftingReport:
+    def __init__(self, crafted, skipped, shortfalls, materials_used, committed):
+        self.crafted = crafted
+        self.skipped = skipped
+        self.shortfalls = shortfalls
+        self.materials_used = materials_used
+        self.committed = committed
+
+    def __len__(self):
+        return len(self.crafted)
+
+    def __repr__(self):
+        return (f"CraftingReport(crafted={len(self.crafted)}, skipped={len(self.skipped)}, "
+                f"committed={self.committed})")
+
+def _commit_inventory(inventory, updates):
+    previous = {}
+    try:
+        for material, quantity in updates.items():
+            previous[material] = inventory.get(material)
+            if quantity > 0:
+                inventory[material] = quantity
+            else:
+                inventory.pop(material, None)
+    except BaseException:
+        for material, quantity in previous.items():
+            if quantity is None:
+                inventory.pop(material, None)
+            else:
+                inventory[material] = quantity
+        raise
+
+def craft_batch(inventory, items, table=None, strict=False):
+    if table is None:
+        table = get_crafting_table()
+    items = list(items)
+    names = material_registry.names
+
+    remaining = {}
+    used = {}
+    crafted = []
+    skipped = []
+    shortfalls = {}
+    for item in items:
+        recipe = table.get_materials(item)
+        if recipe is None:
+            skipped.append(item)
+            shortfalls.setdefault(item, None)
+            continue
+
+        needs = tuple(zip(recipe.material_ids, recipe.quantities))
+        missing = None
+        for material_id, qty in needs:
+            available = remaining.get(material_id)
+            if available is None:
+                available = remaining[material_id] = inventory.get(names[material_id], 0)
+            if available < qty:
+                if missing is None:
+                    missing = {}
+                missing[names[material_id]] = qty - available
+        if missing:
+            skipped.append(item)
+            shortfalls.setdefault(item, missing)
+            continue
+
+        for material_id, qty in needs:
+            remaining[material_id] -= qty
+            used[material_id] = used.get(material_id, 0) + qty
+        crafted.append(item)
+
+    if strict and skipped:
+        return CraftingReport([], items, shortfalls, {}, False)
+
+    _commit_inventory(inventory, {names[material_id]: remaining[material_id] for material_id in used})
+    return CraftingReport(crafted, skipped, shortfalls,
+                          {names[material_id]: qty for material_id, qty in used.items()}, True)
+
+class CraftingRecord:
+    __slots__ = ("item", "materials", "timestamp")
+
+    def __init__(self, item, materials=None, timestamp=None):
+        self.item = item
+        self.materials = Recipe.coerce(materials) if materials is not None else None
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def to_dict(self):
+        materials = dict(self.materials.items()) if self.materials is not None else None
+        return {"item": self.item, "materials": materials, "timestamp": self.timestamp}
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(record["item"], record.get("materials"), record["timestamp"])
+
+    def __repr__(self):
+        return f"CraftingRecord({self.item!r}, timestamp={self.timestamp})"
 
 class CraftingHistory:
-    def __init__(self, max_size=10):
-        self.stack = []
+    def __init__(self, max_size=10, spill_path=None):
+        self._stack = deque(maxlen=max_size)
         self.max_size = max_size
+        self.spill_path = spill_path
+        self._spill_file = None
 
-    def add_craft(self, item):
-        if len(self._stack) >= self._max_size:
-            self._stack.pop(0)
-        self._stack.append(item)
+    def add_craft(self, item, materials=None, timestamp=None):
+        record = CraftingRecord(item, materials, timestamp)
+        if self.spill_path is not None and len(self._stack) == self.max_size:
+            self._spill(self._stack[0])
+        self._stack.append(record)
+        return record
 
-    def undo_last_craft(self):
-        if self._stack:
-            return self._stack.pop()
-        return None
+    def undo_last_craft(self, inventory=None):
+        if not self._stack:
+            return None
+        record = self._stack.pop()
+        if inventory is not None and record.materials is not None:
+            for material, qty in record.materials.items():
+                inventory[material] = inventory.get(material, 0) + qty
+        return record
    
     def peek_last_craft(self):
         return self._stack[-1] if self._stack else None
 
+    def __len__(self):
+        return len(self._stack)
+
+    def __iter__(self):
+        return iter(self._stack)
+
+    def _spill(self, record):
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+        self._spill_file.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+
+    def spilled(self):
+        if self.spill_path is None:
+            return
+        if self._spill_file is not None:
+            self._spill_file.flush()
+        if not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield CraftingRecord.from_dict(json.loads(line))
+
+    def close(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+class QueueEntry:
+    __slots__ = ("handle", "item", "priority")
+
+    def __init__(self, handle, item, priority):
+        self.handle = handle
+        self.item = item
+        self.priority = priority
+
+    def sort_key(self):
+        return (-self.priority, self.handle)
+
+    def __repr__(self):
+        return f"QueueEntry({self.handle}, {self.item!r}, priority={self.priority})"
+
 class CraftingQueue:
     def __init__(self):
-        self._queue = deque()
+        self._entries = {}
+        self._heap = []
+        self._tail_heap = []
+        self._handles = defaultdict(dict)
+        self._next_handle = 0
+        self.version = 0
 
-    def add_to_queue(self, item):
-        self._queue.append(item)
+    def add_to_queue(self, item, priority=0):
+        handle = self._next_handle
+        self._next_handle += 1
+        self._entries[handle] = QueueEntry(handle, item, priority)
+        self._handles[item][handle] = None
+        heapq.heappush(self._heap, (-priority, handle))
+        heapq.heappush(self._tail_heap, (priority, -handle))
+        self.version += 1
+        return handle
+
+    def add_many(self, items, priority=0):
+        return [self.add_to_queue(item, priority) for item in items]
+
+    def remove(self, handle):
+        entry = self._entries.pop(handle, None)
+        if entry is None:
+            return None
+        handles = self._handles[entry.item]
+        del handles[handle]
+        if not handles:
+            del self._handles[entry.item]
+        self.version += 1
+        self._compact()
+        return entry.item
+
+    def _compact(self):
+        if max(len(self._heap), len(self._tail_heap)) > 2 * len(self._entries) + 32:
+            self._heap = [(-entry.priority, handle) for handle, entry in self._entries.items()]
+            heapq.heapify(self._heap)
+            self._tail_heap = [(entry.priority, -handle) for handle, entry in self._entries.items()]
+            heapq.heapify(self._tail_heap)
 
     def remove_from_queue(self, item):
-        self.queue.pop(item)
+        handles = self._handles.get(item)
+        if not handles:
+            return False
+        self.remove(min(handles, key=lambda handle: self._entries[handle].sort_key()))
+        return True
+
+    def remove_last(self):
+        heap = self._tail_heap
+        while heap:
+            priority, negative_handle = heap[0]
+            entry = self._entries.get(-negative_handle)
+            if entry is not None and entry.priority == priority:
+                return self.remove(entry.handle)
+            heapq.heappop(heap)
+        return None
+
+    def set_priority(self, handle, priority):
+        entry = self._entries[handle]
+        if entry.priority != priority:
+            entry.priority = priority
+            heapq.heappush(self._heap, (-priority, handle))
+            heapq.heappush(self._tail_heap, (priority, -handle))
+            self.version += 1
+            self._compact()
+
+    def _first_live(self):
+        heap = self._heap
+        while heap:
+            negative_priority, handle = heap[0]
+            entry = self._entries.get(handle)
+            if entry is not None and entry.priority == -negative_priority:
+                return entry
+            heapq.heappop(heap)
+        return None
 
     def next_to_craft(self):
-        return self._queue.popleft() if self._queue else None
+        entry = self._first_live()
+        if entry is None:
+            return None
+        return self.remove(entry.handle)
    
     def peek_queue(self):
-        return self._queue[0] if self._queue else None
-
-crafting_table.insert_with_quantities("Defender Rally Horn I", {"Iron Ore": 1})
-crafting_table.insert_with_quantities("Defender Rally Horn II", {"Anjanath Scale": 1})
-crafting_table.add_upgrade_path("Defender Rally Horn I", "Defender Rally Horn II")
-crafting_table.insert_with_quantities("Defender Rally Horn III", {"Commendation": 1})
-crafting_table.add_upgrade_path("Defender Rally Horn II", "Defender Rally Horn III")
-crafting_table.insert_with_quantities("Defender Rally Horn IV", {"Pink Rathian Scale+": 1})
-crafting_table.add_upgrade_path("Defender Rally Horn III", "Defender Rally Horn IV")
-crafting_table.insert_with_quantities("Defender Rally Horn V", {"Immortal Dragonscale": 1})
-crafting_table.add_upgrade_path("Defender Rally Horn IV", "Defender Rally Horn V")
-crafting_table.insert_with_quantities("Metal Bagpipe I", {"Iron Ore": 1})
-crafting_table.insert_with_quantities("Metal Bagpipe II", {"Iron Ore": 1})
-crafting_table.add_upgrade_path("Metal Bagpipe I", "Metal Bagpipe II")
-crafting_table.insert_with_quantities("Metal Bagpipe III", {"Earth Crystal": 2, "Machalite Ore": 2, "Iron Ore": 5})
-crafting_table.add_upgrade_path("Metal Bagpipe II", "Metal Bagpipe III")
-crafting_table.insert_with_quantities("Kula Duda I", {"Kulu-Ya-Ku Beak": 1, "Kulu-Ya-Ku Hide": 2, "Kulu-Ya-Ku Scale": 3})
-crafting_table.add_upgrade_path("Metal Bagpipe II", "Kula Duda I")
-crafting_table.insert_with_quantities("Kula Duda II", {"Radobaan Scale": 3, "Kulu-Ya-Ku Beak": 2, "Kulu-Ya-Ku Plume": 2, "Boulder Bone": 3})
-crafting_table.add_upgrade_path("Kula Duda I", "Kula Duda II")
-crafting_table.insert_with_quantities("Kula Duda III", {"Odogaron Claw": 2, "Kulu-Ya-Ku Beak": 2, "Kulu-Ya-Ku Plume": 4, "Warped Bone": 3})
-crafting_table.add_upgrade_path("Kula Duda II", "Kula Duda III")
-crafting_table.insert_with_quantities("Dancing Duval I", {"Kulu-Ya-Ku Beak+": 3, "Kulu-Ya-Ku Hide+": 4, "Kulu-Ya-Ku Scale+": 6})
-crafting_table.add_upgrade_path("Kula Duda III", "Dancing Duval I")
-crafting_table.insert_with_quantities("Dancing Duval II", {"Odogaron Claw+": 2, "Kulu-Ya-Ku Beak+": 4, "Kulu-Ya-Ku Plume+": 3, "Brutal Bone": 3})
-crafting_table.add_upgrade_path("Dancing Duval I", "Dancing Duval II")
-crafting_table.insert_with_quantities("Dancing Duval III", {"Nergigante Talon": 2, "Kulu-Ya-Ku Beak+": 5, "Kulu-Ya-Ku Plume+": 4, "Bird Wyvern Gem": 1})
-crafting_table.add_upgrade_path("Dancing Duval II", "Dancing Duval III")
-crafting_table.insert_with_quantities("Taghrid Al-Nasr I", {"Large Kulu-Ya-Ku Beak": 1, "Kulu-Ya-Ku Thickhide": 2, "Kulu-Ya-Ku Shard": 3, "Thick Bone": 2})
-crafting_table.add_upgrade_path("Dancing Duval III", "Taghrid Al-Nasr I")
-crafting_table.insert_with_quantities("Taghrid Al-Nasr II", {"Nargacuga Hardfang": 2, "Large Kulu-Ya-Ku Beak": 2, "Large Kulu-Ya-Ku Plume": 3, "Monster Slogbone": 3})
-crafting_table.add_upgrade_path("Taghrid Al-Nasr I", "Taghrid Al-Nasr II")
-crafting_table.insert_with_quantities("Aqua Bagpipe I", {"Earth Crystal": 3, "Jyuratodus Shell": 1, "Jyuratodus Scale": 3, "Aqua Sac": 1})
-crafting_table.add_upgrade_path("Metal Bagpipe II", "Aqua Bagpipe I")
-crafting_table.insert_with_quantities("Aqua Bagpipe II", {"Dragonite Ore": 5, "Jyuratodus Fin": 3, "Jyuratodus Fang": 2, "Gajau Skin": 3})
-crafting_table.add_upgrade_path("Aqua Bagpipe I", "Aqua Bagpipe II")
-crafting_table.insert_with_quantities("Aqua Bagpipe III", {"Monster Bone+": 2, "Jyuratodus Fang": 4, "Coral Crystal": 3, "Gajau Whisker": 3})
-crafting_table.add_upgrade_path("Aqua Bagpipe II", "Aqua Bagpipe III")
-crafting_table.insert_with_quantities("Water Tamtam I", {"Carbalite Ore": 5, "Jyuratodus Carapace": 2, "Jyuratodus Scale+": 3, "Gajau Scale": 5})
-crafting_table.add_upgrade_path("Aqua Bagpipe III", "Water Tamtam I")
-crafting_table.insert_with_quantities("Water Tamtam II", {"Fucium Ore": 5, "Jyuratodus Fin+": 4, "Torrent Sac": 3, "Grand Gajau Whisker": 3})
-crafting_table.add_upgrade_path("Water Tamtam I", "Water Tamtam II")
-crafting_table.insert_with_quantities("Water Tamtam III", {"Elder Dragon Bone": 4, "Jyuratodus Fin+": 6, "Jyuratodus Fang+": 5, "Wyvern Gem": 1})
-crafting_table.add_upgrade_path("Water Tamtam II", "Water Tamtam III")
-crafting_table.insert_with_quantities("Water Tamtam IV", {"Jyuratodus Grandfin": 1, "Jyuratodus Hardfang": 1, "Jyuratodus Shard": 3, "Gajau Thickhide": 2})
-crafting_table.add_upgrade_path("Water Tamtam III", "Water Tamtam IV")
-crafting_table.insert_with_quantities("Laguna Drum I", {"Coral Pukei-Pukei Shard": 3, "Coral Pukei-Pukei Fellwing": 2, "Flood Sac": 2, "Bathycite Ore": 2})
-crafting_table.add_upgrade_path("Water Tamtam IV", "Laguna Drum I")
-crafting_table.insert_with_quantities("Laguna Drum II", {"Acidic Glavenus Hardfang": 2, "Monster Solidbone": 3, "Large Coral Pukei-Pukei Sac": 1, "Coral Pukei-Pukei Lash": 1})
-crafting_table.add_upgrade_path("Laguna Drum I", "Laguna Drum II")
-crafting_table.insert_with_quantities("Hidden Harmonic", {"Nargacuga Hardfang": 2, "Nargacuga Shard": 3, "Nargacuga Tailspear": 2, "Meldspar Ore": 1})
-crafting_table.add_upgrade_path("Water Tamtam IV", "Hidden Harmonic")
-crafting_table.insert_with_quantities("Hidden Harmonic+", {"Fulgur Anjanath Hardfang": 3, "Nargacuga Cutwing+": 4, "Nargacuga Lash": 1, "Nargacuga Mantle": 1})
-crafting_table.add_upgrade_path("Hidden Harmonic", "Hidden Harmonic+")
-crafting_table.insert_with_quantities("Cry In The Night", {"Shadowpierce Fang": 2, "Nargacuga Cutwing+": 4, "Nargacuga Hardfang": 4, "Purecrystal": 1})
-crafting_table.add_upgrade_path("Hidden Harmonic+", "Cry In The Night")
-crafting_table.insert_with_quantities("Glacial Bagpipe I", {"Legiana Claw": 3, "Legiana Scale": 4, "Frost Sac": 2})
-crafting_table.add_upgrade_path("Aqua Bagpipe II", "Glacial Bagpipe I")
-crafting_table.insert_with_quantities("Glacial Bagpipe II", {"Paolumu Wing": 4, "Legiana Claw": 4, "Legiana Tail Webbing": 3, "Legiana Plate": 1})
-crafting_table.add_upgrade_path("Glacial Bagpipe I", "Glacial Bagpipe II")
-crafting_table.insert_with_quantities("Sectored", {"Legiana Claw+": 3, "Legiana Scale": 5, "Legiana Wing": 3, "Freezer Sac": 2})
-crafting_table.add_upgrade_path("Glacial Bagpipe II", "Sectored")
-crafting_table.insert_with_quantities("Legia Sectored", {"Daora Claw+": 2, "Legiana Claw+": 5, "Legiana Hide+": 3, "Legiana Gem": 1})
-crafting_table.add_upgrade_path("Sectored", "Legia Sectored")
-crafting_table.insert_with_quantities("Legia Sectored+", {"Legiana Hardclaw": 3, "Legiana Shard": 4, "Legiana Tail Webbing+": 1, "Frozen Bone": 4})
-crafting_table.add_upgrade_path("Legia Sectored", "Legia Sectored+")
-crafting_table.insert_with_quantities("Hoarcry Sectored", {"Obsidian Icetalon": 2, "Rimed Hide": 5, "Stark Wing": 2, "Cryo Sac": 4})
-crafting_table.add_upgrade_path("Legia Sectored+", "Hoarcry Sectored")
-crafting_table.insert_with_quantities("Lilim Glacia", {"Velkhana Hardclaw": 2, "Obsidian Icetalon": 4, "Stark Wing": 2, "Legiana Mantle": 1})
-crafting_table.add_upgrade_path("Hoarcry Sectored", "Lilim Glacia")
-crafting_table.insert_with_quantities("Valkyrie Chordmaker", {"Rathian Spike": 3, "Rathian Scale": 5, "Rathian Shell": 4, "Poison Sac": 3})
-crafting_table.add_upgrade_path("Kula Duda I", "Valkyrie Chordmaker")
-crafting_table.insert_with_quantities("Queen Chordmaker", {"Rathian Spike+": 3, "Rathian Scale+": 5, "Rathian Carapace": 4, "Rathian Plate": 1})
-crafting_table.add_upgrade_path("Valkyrie Chordmaker", "Queen Chordmaker")
-crafting_table.insert_with_quantities("Coral Chordmaker", {"Rathian Spike+": 4, "Pink Rathian Scale+": 5, "Pink Rathian Carapace": 4, "Wyvern Gem": 1})
-crafting_table.add_upgrade_path("Queen Chordmaker", "Coral Chordmaker")
-crafting_table.insert_with_quantities("Royal Chordmaker", {"Elder Dragon Blood": 3, "Rathian Spike+": 5, "Pink Rathian Scale+": 6, "Rathian Ruby": 1})
-crafting_table.add_upgrade_path("Coral Chordmaker", "Royal Chordmaker")
-crafting_table.insert_with_quantities("Royal Chordmaker+", {"Rathian Surspike": 3, "Rathian Shard": 5, "Rathian Cortex": 4})
-crafting_table.add_upgrade_path("Royal Chordmaker", "Royal Chordmaker+")
-crafting_table.insert_with_quantities("Regal Flute", {"Monster Solidbone": 5, "Pink Rathian Shard": 4, "Pink Rathian Cortex": 3, "Rathian Mantle": 1})
-crafting_table.add_upgrade_path("Royal Chordmaker+", "Roegal Flute")
-crafting_table.insert_with_quantities("Gold Chordmaker", {"Gold Rathian Surspike": 3, "Gold Rathian Shard": 5, "Gold Rathian Cortex": 4, "Rath Gleam": 1})
-crafting_table.add_upgrade_path("Royal Chordmaker+", "Gold Chordmaker")
-crafting_table.insert_with_quantities("Striped Dragonga", {"Tigrex Hardclaw": 3, "Tigrex Shard": 4, "Monster Slogbone": 3, "Thick Bone": 5})
-crafting_table.add_upgrade_path("Taghrid Al-Nasr II", "Striped Dragonga")
-crafting_table.insert_with_quantities("Striped Dragonga+", {"Blackcurl Stouthorn": 2, "Tigrex Hardfang": 4, "Tigrex Lash": 1, "Tigrex Mantle": 1})
-crafting_table.add_upgrade_path("Striped Dragonga", "Striped Dragonga+")
-crafting_table.insert_with_quantities("Tigrex Horn", {"Daora Hardclaw": 2, "Tigrex Hardfang": 2, "Tigrex Cortex": 4, "Pure Dragon Blood": 5})
-crafting_table.add_upgrade_path("Striped Dragonga+", "Tigrex Horn")
-crafting_table.insert_with_quantities("Accursed Wail", {"Brute Tigrex Hardclaw": 3, "Brute Tigrex Shard": 5, "Brute Tigrex Hardfang": 2, "Large Wyvern Gem": 1})
-crafting_table.add_upgrade_path("Tigrex Horn", "Accursed Wail")
-crafting_table.insert_with_quantities("Ogrebite", {"Tempered Ebonjaw": 5, "Brute Tigrex Hardclaw": 4, "Brute Tigrex Hardfang": 3, "Tigrex Mantle": 1})
-crafting_table.add_upgrade_path("Accursed Wail", "Ogrebite")
-crafting_table.insert_with_quantities("Thunder Gaida I", {"Dragonite Ore": 5, "Tobi-Kadachi Electrode": 1, "Tobi-Kadachi Claw": 2, "Electro Sac": 1})
-crafting_table.add_upgrade_path("Metal Bagpipe III", "Thunder Gaida I")
-crafting_table.insert_with_quantities("Thunder Gaida II", {"Monster Bone+": 2, "Tobi-Kadachi Electrode": 2, "Tobi-Kadachi Membrane": 2, "Coral Crystal": 3})
-crafting_table.add_upgrade_path("Thunder Gaida I", "Thunder Gaida II")
-crafting_table.insert_with_quantities("Lightning Drum I", {"Carbalite Ore": 5, "Tobi-Kadachi Scale+": 4, "Tobi-Kadachi Pelt+": 3, "Vespoid Innerwing": 3})
-crafting_table.add_upgrade_path("Thunder Gaida II", "Lightning Drum I")
-crafting_table.insert_with_quantities("Lightning Drum II", {"Fucium Ore": 5, "Tobi-Kadachi Electrode+": 2, "Tobi-Kadachi Membrane": 4, "Thunder Sac": 3})
-crafting_table.add_upgrade_path("Lightning Drum I", "Lightning Drum II")
-crafting_table.insert_with_quantities("Lightning Drum III", {"Elder Dragon Blood": 3, "Tobi-Kadachi Electrode+": 4, "Tobi-Kadachi Claw+": 6, "Wyvern Gem": 1})
-crafting_table.add_upgrade_path("Lightning Drum II", "Lightning Drum III")
-crafting_table.insert_with_quantities("Lightning IV", {"Tobi-Kadachi Hardclaw+": 1, "Tobi-Kadachi Shard": 2, "Tobi-Kadachi Thickfur": 2, "Lightning Sac": 1})
-crafting_table.add_upgrade_path("Lightning Drum III", "Lightning Drum IV")
-crafting_table.insert_with_quantities("Usurper's Growl", {"Zinogre Hardclaw": 3, "Zinogre Deathly Shocker": 2, "Zinogre Cortex": 5, "Lightning Sac": 3})
-crafting_table.add_upgrade_path("Lightning Drum IV", "Usurper's Growl")
-crafting_table.insert_with_quantities("Usurper's Growl+", {"Zinogre Hardhorn": 3, "Zinogre Electrofur+": 4, "Fulgurbug": 5, "Zinogre Skymerald": 1})
-crafting_table.add_upgrade_path("Usurper's Growl", "Usurper's Growl+")
-crafting_table.insert_with_quantities("Despot's Thunderclap", {"Spiritvein Solidbone": 5, "Zinogre Hardhorn": 2, "Zinogre Deathly Shocker": 5, "Large Elder Dragon Gem": 1})
-crafting_table.add_upgrade_path("Usurper's Growl+", "Despot's Thunderclap")
-crafting_table.insert_with_quantities("Great Bagpipe I", {"Dragonite Ore": 2, "Machalite Ore": 5, "Monster Bone M": 2})
-crafting_table.add_upgrade_path("Metal Bagpipe III", "Great Bagpipe I")
-crafting_table.insert_with_quantities("Great Bagpipe II", {"Monster Bone+": 2, "Dragonite Ore": 5, "Coral Crystal": 2, "Machalite Ore": 10})
-crafting_table.add_upgrade_path("Great Bagpipe I", "Great Bagpipe II")
-crafting_table.insert_with_quantities("Great Bagpipe III", {"Carbalite Ore": 8, "Dragonite Ore": 5, "Dragonvein Crystal": 2})
-crafting_table.add_upgrade_path("Great Bagpipe II", "Great Bagpipe III")
-crafting_table.insert_with_quantities("Fortissimo I", {"Fucium Ore": 8, "Carbalite Ore": 5, "Dragonite Ore": 10, "Dragonvein Crystal": 3})
-crafting_table.add_upgrade_path("Great Bagpipe III", "Fortissimo I")
-crafting_table.insert_with_quantities("Fortissimo II", {"Elder Dragon Blood": 2, "Fucium Ore": 13, "Carbalite Ore": 20, "Firecell Stone": 1})
-crafting_table.add_upgrade_path("Fortissimo I", "Fortissimo II")
-crafting_table.insert_with_quantities("Nergal Groove", {"Nergigante Talon": 3, "Nergigante Regrowth Plate": 4, "Nergigante Tail": 2, "Nergigante Carapace": 2})
-crafting_table.add_upgrade_path("Fortissimo II", "Nergal Groove")
-crafting_table.insert_with_quantities("Desolation's Overture", {"Xeno'jiiva Horn": 2, "Nergigante Horn+": 5, "Nergigante Talon": 5, "Nergigante Gem": 1})
-crafting_table.add_upgrade_path("Nergal Groove", "Desolation's Overture")
-crafting_table.insert_with_quantities("Ruinous Desolation", {"Annihilating Greathorn": 3, "Nergigante Hardclaw": 4, "Eternal Regrowth": 5, "Large Elder Dragon Gem": 1})
-crafting_table.add_upgrade_path("Desolation's Overture", "Ruinous Desolation")
-crafting_table.insert_with_quantities("Sforzando I", {"Eltalite Ore": 6, "Carbalite Ore": 10, "Spiritvein Crystal": 2, "Purecrystal": 1})
-crafting_table.add_upgrade_path("Fortissimo II", "Sforzando I")
-crafting_table.insert_with_quantities("Sforzando II", {"Monster Slogbone": 3, "Eltalite Ore": 4, "Meldspar Ore": 2, "Bathycite Ore": 2})
-crafting_table.add_upgrade_path("Sforzando I", "Sforzando II")
-crafting_table.insert_with_quantities("Sforzando III", {"Pure Dragon Blood": 3, "Eltalite Ore": 6, "Meldspar Ore": 3, "Purecrystal": 1})
-crafting_table.add_upgrade_path("Sforzando II", "Sforzando III")
-crafting_table.insert_with_quantities("Raven Shamisen", {"Garuga Shard": 3, "Garuga Silverpelt": 4, "Garuga Auricle": 2, "Fey Wyvern Gem": 1})
-crafting_table.add_upgrade_path("Sforzando II", "Raven Shamisen")
-crafting_table.insert_with_quantities("Wolf Shamisen", {"Scratched Shell": 3, "Garuga Fellwing": 2, "Fancy Beak": 3, "Large Wyvern Gem": 1})
-crafting_table.add_upgrade_path("Raven Shamisen", "Wolf Shamisen")
-crafting_table.insert_with_quantities("Devil's Maestro", {"Deviljho Scale": 6, "Deviljho Talon": 2, "Deviljho Tallfang": 3, "Deviljho Saliva": 2})
-crafting_table.insert_with_quantities("Deep Vero", {"Elder Dragon Blood": 5, "Deviljho Scalp": 2, "Deviljho Tallfang": 5, "Deviljho Gem": 1})
-crafting_table.add_upgrade_path("Devil's Maestro", "Deep Vero")
-crafting_table.insert_with_quantities("Fate's Dirge", {"Vile Fang": 3, "Deviljho Ripper": 2, "Black Blood": 3, "Deviljho Crook": 1})
-crafting_table.add_upgrade_path("Deep Vero", "Fate's Dirge")
-crafting_table.insert_with_quantities("Denden Daiko", {"Rajang Hardhorn": 1, "Rajang Hardclaw": 1, "Rajang Hardfang": 2, "Rajang Wildpelt": 2})
-crafting_table.insert_with_quantities("Denden Doomsounder", {"Tempered Glimmerpelt": 3, "Rajang Hardhorn": 3, "Rajang Hardfang": 7, "Gold Rajang Pelt+": 3})
-crafting_table.add_upgrade_path("Denden Daiko", "Denden Doomsounder")
-crafting_table.insert_with_quantities("Demonlord Wardrum", {"Ghoulish Gold Gorer": 3, "Rajang Apoplexy": 2, "Gold Rajang Pelt+": 5, "Rajang Heart": 1})
-crafting_table.insert_with_quantities("Brimstren Drakesong", {"Stygian Zinogre Hardhorn": 1, "Stygian Zinogre Hardclaw": 1, "Stygian Zinogre Dragonlocks": 2, "Stygian Zinogre Dragonhold": 2})
-crafting_table.insert_with_quantities("Stygian Tristitia", {"Tempered Dragonhold": 3, "Stygian Zinogre Hardhorn": 2, "Stygian Zinogre Hardclaw": 5, "Stygian Zinogre Skymerald": 1})
-crafting_table.add_upgrade_path("Brimstren Drakesong", "Stygian Tristitia")
-crafting_table.insert_with_quantities("Lightbreak Timbre", {"Brach Obliterator": 3, "Brach Warhead": 1, "Indestructible Ebonshell": 4, "Immortal Reactor": 1})
-crafting_table.insert_with_quantities("Alatreon Harmony", {"Alatreon Mantle": 3, "Skyswayer": 1, "Alatreon Riptalon": 3, "Large Elder Dragon Gem": 1})
-crafting_table.insert_with_quantities("Alatreon Revival", {"Alatreon Direwing": 1, "Skyswayer": 2, "Alatreon Riptalon": 2, "Azure Dragonsphire": 1})
-crafting_table.add_upgrade_path("Alatreon Harmony", "Alatreon Revival")
-crafting_table.insert_with_quantities("Fatalis Menace", {"Fatalis Shard": 3, "Fatalis Hardhorn": 1, "Fatalis Pectus": 1, "Fatalis Evil Eye": 1})
-crafting_table.insert_with_quantities("Fatalis Menace Wailer", {"Large Elder Dragon Gem": 1, "Fatalis Pectus": 2, "Fatalis Hardhorn": 2, "Fatalis Evil Eye": 1})
-crafting_table.add_upgrade_path("Fatalis Menace", "Fatalis Menace Wailer")
-crafting_table.insert_with_quantities("Guild Palace Bard", {"Fest Ticket": 2, "Amber Hardfang": 2, "Gracium": 5, "Purecrystal": 1})
-crafting_table.insert_with_quantities("Royal Song Symphony", {"Hero King Coin": 1, "Namielle Hardclaw": 3, "Large Elder Dragon Bone": 5, "Pure Dragon Blood": 3})
-crafting_table.add_upgrade_path("Guild Palace Bard", "Royal Song Symphony")
-
-print("\nAll Recipes:")
-for item, materials in crafting_table.display_all_recipes():
-    print(f"{item}: {materials}")
-
-print("\nRecipe Tree:")
-crafting_table.display_upgrade_path()
+        entry = self._first_live()
+        return entry.item if entry is not None else None
+
+    def entries(self):
+        return sorted(self._entries.values(), key=QueueEntry.sort_key)
+
+    def counts(self):
+        counts = {}
+        for entry in self.entries():
+            counts[entry.item] = counts.get(entry.item, 0) + 1
+        return counts
+
+    def count(self, item):
+        return len(self._handles.get(item, ()))
+
+    def clear(self):
+        if self._entries:
+            self._entries.clear()
+            self._heap.clear()
+            self._tail_heap.clear()
+            self._handles.clear()
+            self.version += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return (entry.item for entry in self.entries())
+
+    def __contains__(self, item):
+        return item in self._handles
+
+    def _take(self, entries, items):
+        counts = {}
+        for item in items:
+            counts[item] = counts.get(item, 0) + 1
+        taken = []
+        for entry in entries:
+            if counts.get(entry.item, 0) > 0:
+                counts[entry.item] -= 1
+                taken.append(entry)
+        return taken
+
+    def planned_entries(self, plan):
+        return self._take(self.entries(), plan.crafts)
+
+    def craft_entries(self, entries, inventory, table=None, strict=False):
+        entries = list(entries)
+        report = craft_batch(inventory, [entry.item for entry in entries], table, strict)
+        if report.committed:
+            if len(report.crafted) == len(self._entries):
+                self.clear()
+            else:
+                for entry in self._take(entries, report.crafted):
+                    self.remove(entry.handle)
+        return report
+
+    def craft_all(self, inventory, table=None, strict=False):
+        return self.craft_entries(self.entries(), inventory, table, strict)
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "hunting_horns.json")
+
+def load_hunting_horns(table):
+    import MonsterHunterCatalog
+    MonsterHunterCatalog.load_catalog(os.environ.get("MH_CATALOG", DEFAULT_CATALOG_PATH), table)
+
+catalog_loader = load_hunting_horns
+_crafting_table = None
+_catalog_lock = threading.Lock()
+
+def set_catalog_loader(loader):
+    global catalog_loader, _crafting_table
+    with _catalog_lock:
+        catalog_loader = loader
+        _crafting_table = None
+
+def get_crafting_table():
+    global _crafting_table
+    if _crafting_table is None:
+        with _catalog_lock:
+            if _crafting_table is None:
+                table = CraftingHashTable()
+                catalog_loader(table)
+                _crafting_table = table
+    return _crafting_table
+
+def _crafting_table_stats():
+    table = _crafting_table
+    return table.bucket_stats() if table is not None else None
+
+MonsterHunterMetrics.register_source("crafting_table", _crafting_table_stats)
+
+def __getattr__(name):
+    if name == "crafting_table":
+        return get_crafting_table()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def main():
+    crafting_table = get_crafting_table()
+
+    print("\nAll Recipes:")
+    for item, materials in sorted(crafting_table.display_all_recipes(), key=lambda x: x[0]):
+        print(f"{item}: {materials.display()}")
+
+    print("\nRecipe Tree:")
+    crafting_table.display_upgrade_path()
+
+if __name__ == '__main__':
+    import MonsterHunterWeapons
+    MonsterHunterWeapons.main()
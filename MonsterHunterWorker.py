@@ -0,0 +1,124 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import MonsterHunterMetrics
+import MonsterHunterSearch
+
+try:
+    import MonsterHunterEngine
+except ImportError:
+    MonsterHunterEngine = None
+
+POLL_MS = 20
+
+class Job:
+    def __init__(self, channel, on_done, on_error):
+        self.channel = channel
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+class ComputeWorker:
+    def __init__(self, master, max_workers=2, poll_ms=POLL_MS):
+        self.master = master
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="mh-compute") if max_workers else None
+        self._jobs = {}
+        self._after_id = None
+
+    def submit(self, channel, func, *args, on_done=None, on_error=None, **kwargs):
+        self.cancel(channel)
+        job = Job(channel, on_done, on_error)
+        kwargs["cancel_event"] = job.cancel_event
+
+        if self.executor is None:
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._fail(job, e)
+            else:
+                if job.on_done is not None:
+                    job.on_done(result)
+            return job
+
+        job.future = self.executor.submit(func, *args, **kwargs)
+        self._jobs[channel] = job
+        if self._after_id is None:
+            self._after_id = self.master.after(self.poll_ms, self._poll)
+        return job
+
+    def cancel(self, channel):
+        job = self._jobs.pop(channel, None)
+        if job is not None:
+            job.cancel()
+        return job is not None
+
+    def pending(self, channel):
+        return channel in self._jobs
+
+    def _fail(self, job, error):
+        if job.on_error is None:
+            raise error
+        job.on_error(error)
+
+    def _poll(self):
+        self._after_id = None
+        errors = []
+        try:
+            for channel, job in list(self._jobs.items()):
+                if not job.future.done() or self._jobs.get(channel) is not job:
+                    continue
+                del self._jobs[channel]
+                if job.future.cancelled():
+                    continue
+                try:
+                    error = job.future.exception()
+                    if error is not None:
+                        self._fail(job, error)
+                    elif job.on_done is not None:
+                        job.on_done(job.future.result())
+                except Exception as e:
+                    errors.append(e)
+        finally:
+            if self._jobs and self._after_id is None:
+                self._after_id = self.master.after(self.poll_ms, self._poll)
+        if errors:
+            raise errors[0]
+
+    def shutdown(self):
+        for channel in list(self._jobs):
+            self.cancel(channel)
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+@MonsterHunterMetrics.timed("worker.sorted_weapons")
+def sorted_weapons(table, cancel_event=None):
+    return sorted(weapon for weapon, _ in table.display_all_recipes())
+
+@MonsterHunterMetrics.timed("worker.search_weapons")
+def search_weapons(index, weapon_names, search_term, cancel_event=None):
+    if index is None:
+        index = MonsterHunterSearch.NGramIndex()
+        index.add_many((weapon, weapon) for weapon in weapon_names)
+    return index, sorted(index.search(search_term))
+
+@MonsterHunterMetrics.timed("worker.craftable_weapons")
+def craftable_weapons(table, inventory, cancel_event=None):
+    recipes = table.display_all_recipes()
+    if MonsterHunterEngine is not None:
+        craft_counts = MonsterHunterEngine.craft_counts(inventory, table)
+    else:
+        craft_counts = {weapon: materials.craft_count(inventory) for weapon, materials in recipes}
+    return sorted(weapon for weapon, _ in recipes), craft_counts
@@ -0,0 +1,319 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+import MonsterHunterWeapons
+from synthetic import generate_catalog, generate_inventory
+
+class HeadlessTreeview:
+    def __init__(self):
+        self.rows = {}
+        self.order = []
+        self.stale = False
+        self.next_id = 0
+        self.selected = ()
+
+    def _children(self):
+        if self.stale:
+            self.order = [iid for iid in self.order if iid in self.rows]
+            self.stale = False
+        return self.order
+
+    def insert(self, parent, index, iid=None, values=()):
+        if iid is None:
+            iid = f"I{self.next_id:06d}"
+            self.next_id += 1
+        self.rows[iid] = tuple(values)
+        if index == 'end':
+            self.order.append(iid)
+        else:
+            self._children().insert(index, iid)
+        return iid
+
+    def delete(self, *items):
+        for iid in items:
+            del self.rows[iid]
+        self.stale = True
+
+    def item(self, iid, option=None, **kw):
+        if 'values' in kw:
+            self.rows[iid] = tuple(kw['values'])
+            return None
+        return {'values': list(self.rows[iid])}
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, items):
+        self.selected = tuple(items)
+
+    def focus(self, item=None):
+        return ''
+
+    def cget(self, option):
+        return 20
+
+    def configure(self, **options):
+        pass
+
+    def bind(self, sequence, func, add=None):
+        pass
+
+    def bbox(self, item):
+        return ''
+
+    def yview_moveto(self, fraction):
+        pass
+
+class HeadlessScrollbar:
+    def configure(self, **options):
+        pass
+
+    def set(self, first, last):
+        pass
+
+class HeadlessMaster:
+    def after(self, ms, func, *args):
+        func(*args)
+        return None
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, after_id):
+        pass
+
+class HeadlessEntry:
+    def __init__(self, text=""):
+        self.text = text
+
+    def get(self):
+        return self.text
+
+def headless_gui():
+    try:
+        import MonsterHunterGUI
+        import MonsterHunterStore
+        import MonsterHunterVirtualList
+        import MonsterHunterWorker
+    except ImportError as e:
+        print(f"Skipping GUI benchmarks: {e}")
+        return None
+
+    gui = MonsterHunterGUI.MonsterHunterGUI.__new__(MonsterHunterGUI.MonsterHunterGUI)
+    gui.master = HeadlessMaster()
+    gui.store = MonsterHunterStore.Store(":memory:")
+    gui.material_inventory = MonsterHunterStore.PersistentInventory(gui.store)
+    gui._save_after_id = None
+    gui.worker = MonsterHunterWorker.ComputeWorker(gui.master, max_workers=0)
+    gui.craft_counts = None
+    gui.craftable_filter = None
+    gui.craftable_weapon_names = []
+    gui.material_search_index = None
+    gui.material_search_version = None
+    gui.weapon_names = []
+    gui.weapon_search_index = None
+    gui._search_after_id = None
+    for name in ("weapon", "inventory", "craftable"):
+        tree = HeadlessTreeview()
+        setattr(gui, f"{name}_tree", tree)
+        setattr(gui, f"{name}_list", MonsterHunterVirtualList.VirtualList(tree, HeadlessScrollbar(), getattr(gui, f"{name}_row")))
+    gui.search_entry = HeadlessEntry()
+    gui.material_search_entry = HeadlessEntry()
+    gui.load_queue()
+    gui.load_history()
+    gui.material_inventory.subscribe(gui.on_inventory_changed)
+    return gui
+
+def measure(func, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        func(state)
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+def bench_core(size, repeat, seed):
+    weapons, upgrades = generate_catalog(size, seed)
+    recipes = [(weapon, MonsterHunterWeapons.Recipe.from_dict(materials)) for weapon, materials in weapons]
+    names = [weapon for weapon, _ in weapons]
+
+    def loaded_table():
+        table = MonsterHunterWeapons.CraftingHashTable()
+        table.bulk_load(recipes)
+        table.add_upgrade_paths(upgrades)
+        return table
+
+    def insert(table):
+        for weapon, recipe in recipes:
+            table.insert(weapon, recipe)
+
+    def insert_with_quantities(table):
+        for weapon, materials in weapons:
+            table.insert_with_quantities(weapon, materials)
+
+    def get_materials(table):
+        for weapon in names:
+            table.get_materials(weapon)
+
+    def upgrade_traversal(table):
+        for weapon in names:
+            table.get_upgrade_path(weapon)
+            table.get_descendants(weapon)
+
+    def upgrade_cost(table):
+        for weapon in names:
+            table.get_upgrade_cost(weapon)
+
+    def queue_throughput(queue):
+        for weapon in names:
+            queue.add_to_queue(weapon)
+        while queue.next_to_craft() is not None:
+            pass
+
+    batch_table = loaded_table()
+    inventory = generate_inventory(weapons, seed)
+
+    def craft_batch(queue):
+        queue.craft_all(dict(inventory), batch_table)
+
+    def queued():
+        queue = MonsterHunterWeapons.CraftingQueue()
+        for weapon in names:
+            queue.add_to_queue(weapon)
+        return queue
+
+    empty_table = MonsterHunterWeapons.CraftingHashTable
+    return {
+        "insert": measure(insert, repeat, empty_table),
+        "insert_with_quantities": measure(insert_with_quantities, repeat, empty_table),
+        "bulk_load": measure(lambda table: table.bulk_load(recipes), repeat, empty_table),
+        "get_materials": measure(get_materials, repeat, loaded_table),
+        "display_all_recipes": measure(lambda table: table.display_all_recipes(), repeat, loaded_table),
+        "_resize": measure(lambda table: table._resize(), repeat, loaded_table),
+        "upgrade_traversal": measure(upgrade_traversal, repeat, loaded_table),
+        "upgrade_cost": measure(upgrade_cost, repeat, loaded_table),
+        "queue_throughput": measure(queue_throughput, repeat, MonsterHunterWeapons.CraftingQueue),
+        "craft_batch": measure(craft_batch, repeat, queued),
+    }
+
+def bench_gui(size, repeat, seed):
+    weapons, upgrades = generate_catalog(size, seed)
+    inventory = generate_inventory(weapons, seed)
+
+    def loader(table):
+        table.bulk_load(weapons)
+        table.add_upgrade_paths(upgrades)
+
+    MonsterHunterWeapons.set_catalog_loader(loader)
+    table = MonsterHunterWeapons.crafting_table
+    craftable = [weapon for weapon, materials in weapons
+                 if all(inventory.get(material, 0) >= qty for material, qty in materials.items())]
+
+    def gui_with_inventory():
+        gui = headless_gui()
+        gui.material_inventory.update(inventory)
+        gui.populate_weapons()
+        gui.check_craftable_weapons()
+        return gui
+
+    if headless_gui() is None:
+        return {}
+
+    def gui_with_search_index():
+        gui = gui_with_inventory()
+        gui.search_entry.text = "horn"
+        gui.apply_weapon_filter()
+        return gui
+
+    def filter_weapons(gui):
+        for term in ("s", "sy", "syn", "synthetic horn 1", "synthetic horn 12"):
+            gui.search_entry.text = term
+            gui.filter_weapons()
+
+    def filter_craftable_weapons(gui):
+        for term in ("r", "ra", "rat", "rathalos", "rathalos scale+", ""):
+            gui.material_search_entry.text = term
+            gui.filter_craftable_weapons()
+
+    def deduct_materials(gui):
+        for weapon in craftable[:200]:
+            materials = table.get_materials(weapon)
+            if gui.check_materials_available(materials):
+                gui.deduct_materials(materials)
+
+    return {
+        "populate_weapons": measure(lambda gui: gui.populate_weapons(), repeat, gui_with_inventory),
+        "filter_weapons": measure(filter_weapons, repeat, gui_with_search_index),
+        "check_craftable_weapons": measure(lambda gui: gui.check_craftable_weapons(), repeat, gui_with_inventory),
+        "filter_craftable_weapons": measure(filter_craftable_weapons, repeat, gui_with_inventory),
+        "deduct_materials": measure(deduct_materials, repeat, gui_with_inventory),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\nComparison against {baseline_path} (median, new / old):")
+    for size, operations in results.items():
+        for name, timing in operations.items():
+            old = baseline.get(size, {}).get(name)
+            if old:
+                ratio = timing["median"] / old["median"] if old["median"] else float("inf")
+                flag = "  REGRESSION" if ratio > threshold else ""
+                print(f"{size:>8} {name:<26} {ratio:6.2f}x{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crafting core and GUI refresh paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-gui", action="store_true", help="skip the headless GUI benchmarks")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results", "latest.json"))
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio flagged as a regression")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        operations = bench_core(size, args.repeat, args.seed)
+        if not args.no_gui:
+            operations.update(bench_gui(size, args.repeat, args.seed))
+        results[str(size)] = operations
+        for name, timing in operations.items():
+            print(f"{size:>8} {name:<26} min {timing['min'] * 1000:10.2f} ms   median {timing['median'] * 1000:10.2f} ms")
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare, args.threshold)
+
+if __name__ == '__main__':
+    main()
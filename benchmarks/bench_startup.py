@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, time, json
+start = time.perf_counter()
+import MonsterHunterWeapons
+import_time = time.perf_counter() - start
+
+size = int(sys.argv[1])
+def synthetic_loader(table):
+    for i in range(size):
+        table.insert_with_quantities(f"Weapon {i}", {f"Material {i % 997}": 1 + i % 5, f"Material {(i * 7) % 991}": 2})
+        if i % 10:
+            table.add_upgrade_path(f"Weapon {i - 1}", f"Weapon {i}")
+
+if size:
+    MonsterHunterWeapons.set_catalog_loader(synthetic_loader)
+start = time.perf_counter()
+MonsterHunterWeapons.crafting_table
+load_time = time.perf_counter() - start
+print(json.dumps({"size": size, "import_seconds": import_time, "first_access_seconds": load_time}))
+"""
+
+CATALOG_CHILD = """
+import sys, time, json
+import MonsterHunterCatalog, MonsterHunterWeapons
+use_cache = sys.argv[2] == "cache"
+start = time.perf_counter()
+MonsterHunterCatalog.load_catalog(sys.argv[1], MonsterHunterWeapons.CraftingHashTable(), use_cache=use_cache)
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+def run_child(code, *args):
+    output = subprocess.run(
+        [sys.executable, "-c", code, *map(str, args)],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def write_synthetic_catalog(size, path):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from synthetic import generate_catalog
+    weapons, upgrades = generate_catalog(size)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"weapons": [{"name": name, "materials": materials} for name, materials in weapons],
+                   "upgrades": upgrades}, f)
+
+def measure_catalog(size, repeats):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.json")
+        write_synthetic_catalog(size, path)
+        json_runs = [run_child(CATALOG_CHILD, path, "json")["seconds"] for _ in range(repeats)]
+        run_child(CATALOG_CHILD, path, "cache")
+        cache_runs = [run_child(CATALOG_CHILD, path, "cache")["seconds"] for _ in range(repeats)]
+    return {"size": size, "json_seconds": min(json_runs), "cache_seconds": min(cache_runs)}
+
+def measure(size, repeats):
+    runs = [run_child(CHILD, size) for _ in range(repeats)]
+    return {
+        "size": size,
+        "import_seconds": min(run["import_seconds"] for run in runs),
+        "first_access_seconds": min(run["first_access_seconds"] for run in runs),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MonsterHunterWeapons import time against catalog size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 1000, 10000, 100000],
+                        help="synthetic catalog sizes; 0 uses the built-in catalog")
+    parser.add_argument("--catalog-sizes", type=int, nargs="*", default=[10000, 100000],
+                        help="synthetic catalog sizes to load from JSON and from the compiled cache")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = [measure(size, args.repeats) for size in args.sizes]
+    for result in results:
+        print(f"{result['size']:>8} recipes: import {result['import_seconds'] * 1000:8.2f} ms, "
+              f"first access {result['first_access_seconds'] * 1000:10.2f} ms")
+
+    catalog_results = [measure_catalog(size, args.repeats) for size in args.catalog_sizes]
+    for result in catalog_results:
+        print(f"{result['size']:>8} weapons: json {result['json_seconds'] * 1000:10.2f} ms, "
+              f"cache {result['cache_seconds'] * 1000:10.2f} ms "
+              f"({result['json_seconds'] / result['cache_seconds']:.2f}x)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"first_access": results, "catalog_load": catalog_results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
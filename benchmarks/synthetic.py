@@ -0,0 +1,41 @@
+import random
+
+MONSTERS = ["Rathalos", "Rathian", "Tigrex", "Nargacuga", "Zinogre", "Legiana", "Odogaron", "Jyuratodus",
+            "Tobi-Kadachi", "Kulu-Ya-Ku", "Anjanath", "Deviljho", "Nergigante", "Velkhana", "Rajang", "Namielle"]
+PARTS = ["Scale", "Shell", "Claw", "Fang", "Plate", "Gem", "Hide", "Tail", "Horn", "Wing", "Cortex", "Shard"]
+GRADES = ["", "+", " Hard", " Mantle"]
+ORES = ["Iron Ore", "Machalite Ore", "Dragonite Ore", "Carbalite Ore", "Fucium Ore", "Eltalite Ore",
+        "Earth Crystal", "Coral Crystal", "Dragonvein Crystal", "Purecrystal", "Elder Dragon Blood"]
+
+def material_names(count):
+    names = list(ORES)
+    index = 0
+    while len(names) < count:
+        monster = MONSTERS[index % len(MONSTERS)]
+        part = PARTS[(index // len(MONSTERS)) % len(PARTS)]
+        grade = GRADES[(index // (len(MONSTERS) * len(PARTS))) % len(GRADES)]
+        tier = index // (len(MONSTERS) * len(PARTS) * len(GRADES))
+        names.append(f"{monster} {part}{grade}" + (f" {tier}" if tier else ""))
+        index += 1
+    return names[:count]
+
+def generate_catalog(size, seed=0, chain_length=8):
+    rng = random.Random(seed)
+    materials = material_names(max(64, size // 20))
+    weapons = []
+    upgrades = []
+    for index in range(size):
+        name = f"Synthetic Horn {index}"
+        recipe = {}
+        for material in rng.sample(materials, rng.randint(1, 4)):
+            recipe[material] = rng.randint(1, 6)
+        weapons.append((name, recipe))
+        if index % chain_length:
+            base = index - 1 - (rng.randrange(min(index % chain_length, 3)) if index % 3 == 0 else 0)
+            upgrades.append((f"Synthetic Horn {base}", name))
+    return weapons, upgrades
+
+def generate_inventory(weapons, seed=0, coverage=0.6, max_quantity=30):
+    rng = random.Random(seed)
+    materials = sorted({material for _, recipe in weapons for material in recipe})
+    return {material: rng.randint(1, max_quantity) for material in materials if rng.random() < coverage}